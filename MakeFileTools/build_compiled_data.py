@@ -0,0 +1,9 @@
+import os
+import sys
+
+CUR_FOLDER = os.path.dirname(__file__)
+sys.path.insert(0, os.path.dirname(os.path.abspath(CUR_FOLDER)))
+
+import unicode_data
+
+unicode_data.compile_data()
@@ -0,0 +1,273 @@
+"""
+按依赖关系增量地重新生成 ToolFiles（make app 中 update_data.py 之后的部分）。
+
+每一步声明它的代码文件、输入文件与输出文件：
+  names_base  data/NamesList.txt                  → .cache/build/NamesList.base.mp.zlib（build_names_json.py 的结果）
+  ucd         data/ucd.nounihan.flat.xml          → .cache/build/ucd.mp.zlib、Versions.mp.zlib、CommonNames.mp.zlib
+  names       names_base 与 ucd 的结果            → NamesList.mp.zlib（supply_info.py 的合并部分）
+  defined     data/NamesList.txt                  → DefinedCharacterList.mp.zlib
+  fallback    defined、names、CommonNames 与字体   → FontFallback.mp.zlib
+  compiled    ToolFiles/*.mp.zlib                 → ToolFiles/compiled/
+代码与输入文件内容的 SHA-256 与上次成功运行时相同、且输出文件没有被改动时跳过该步。
+例如只更新了 NamesList.txt 时不会重新解析 UCD 的 XML，只换了一个字体时只重新读取这个字体的 cmap（按字体的哈希缓存）。
+运行记录保存在 .cache/build/state.json，文件的哈希按 (大小, 修改时间) 缓存，没有改动的大文件不必重新读取。
+同一次运行中，下游的步骤直接使用上游在内存中的结果，只有上游被跳过时才从它的输出文件读取。
+某一步失败时，依赖它的输出的步骤不再执行，其余步骤照常执行。
+"""
+import os
+import sys
+import json
+import time
+import zlib
+import hashlib
+import argparse
+import traceback
+
+import msgpack
+
+CUR_FOLDER = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(CUR_FOLDER)
+sys.path.insert(0, ROOT)
+
+import unicode_data
+from names_table import NamesTable
+import build_names_json
+import supply_info
+import build_defined_character_list
+import build_font_fallback
+
+BUILD_FOLDER = os.path.join(ROOT, '.cache', 'build')
+STATE_PATH = os.path.join(BUILD_FOLDER, 'state.json')
+CMAPS_FOLDER = os.path.join(BUILD_FOLDER, 'cmaps')
+NAMES_BASE_PATH = os.path.join(BUILD_FOLDER, 'NamesList.base.mp.zlib')
+UCD_CACHE_PATH = os.path.join(BUILD_FOLDER, 'ucd.mp.zlib')
+NAMES_TXT_PATH = build_names_json.NAMES_LIST_PATH
+UCD_XML_PATH = supply_info.UCD_XLM_PATH
+TOOL_FILES = unicode_data.SOURCE_PATHS
+
+
+def _code(*names):
+    # 每一步都依赖本脚本，改动本脚本会使所有步骤重新执行
+    return [os.path.join(CUR_FOLDER, 'build_data.py'), *(os.path.join(ROOT, name) for name in names)]
+
+
+def _read_zlib(path, **kwargs):
+    with open(path, 'rb') as f:
+        return msgpack.unpackb(zlib.decompress(f.read()), strict_map_key=False, **kwargs)
+
+
+def _write_zlib(path, data):
+    with open(path + '.tmp', 'wb') as f:
+        f.write(zlib.compress(data))
+    os.replace(path + '.tmp', path)
+
+
+class Step:
+    """
+    code、inputs、outputs 为文件路径列表。run(builder) 生成全部输出文件并返回供下游使用的结果（可以为 None），
+    load() 在本步被跳过时从输出文件读取同样的结果。
+    """
+
+    def __init__(self, name, code, inputs, outputs, run, load=None):
+        self.name = name
+        self.code = code
+        self.inputs = inputs
+        self.outputs = outputs
+        self.run = run
+        self.load = load
+
+
+class FileHasher:
+    """文件内容的 SHA-256；cache 为 {相对路径: [大小, 修改时间, 哈希]}，大小与修改时间都没变时直接使用缓存。"""
+
+    def __init__(self, cache):
+        self.cache = cache
+
+    def __call__(self, path):
+        stat = os.stat(path)
+        key = os.path.relpath(path, ROOT)
+        cached = self.cache.get(key)
+        if cached and cached[0] == stat.st_size and cached[1] == stat.st_mtime_ns:
+            return cached[2]
+        sha = hashlib.sha256()
+        with open(path, 'rb') as f:
+            while chunk := f.read(1 << 20):
+                sha.update(chunk)
+        self.cache[key] = [stat.st_size, stat.st_mtime_ns, sha.hexdigest()]
+        return sha.hexdigest()
+
+
+class Builder:
+    def __init__(self, steps, workers=1, force=False):
+        self.steps = {step.name: step for step in steps}
+        self.workers = workers
+        self.force = force
+        self.values = {}
+        try:
+            with open(STATE_PATH, encoding='utf-8') as f:
+                self.state = json.load(f)
+        except (OSError, ValueError):
+            self.state = {'files': {}, 'steps': {}}
+        self.hash = FileHasher(self.state['files'])
+        self.producers = {path: step.name for step in steps for path in step.outputs}
+
+    def get(self, name):
+        """名为 name 的步骤的结果：本次运行过则直接使用，否则从它的输出文件读取。"""
+        if name not in self.values:
+            self.values[name] = self.steps[name].load()
+        return self.values[name]
+
+    def cmap_codes(self, path):
+        """字体 cmap 中的码位，按字体文件的哈希缓存。"""
+        cache_path = os.path.join(CMAPS_FOLDER, self.hash(path) + '.mp')
+        if os.path.exists(cache_path):
+            with open(cache_path, 'rb') as f:
+                return msgpack.unpackb(f.read())
+        codes = build_font_fallback.read_cmap_codes(path)
+        os.makedirs(CMAPS_FOLDER, exist_ok=True)
+        with open(cache_path + '.tmp', 'wb') as f:
+            f.write(msgpack.packb(codes))
+        os.replace(cache_path + '.tmp', cache_path)
+        return codes
+
+    def _relative_hashes(self, paths):
+        return {os.path.relpath(path, ROOT): self.hash(path) for path in paths}
+
+    def _step_key(self, step):
+        digests = self._relative_hashes(step.code + step.inputs)
+        return hashlib.sha256(json.dumps(digests, sort_keys=True).encode('utf-8')).hexdigest()
+
+    def _is_up_to_date(self, step, key):
+        record = self.state['steps'].get(step.name)
+        if self.force or record is None or record['key'] != key:
+            return False
+        return all(
+            os.path.exists(path) and self.hash(path) == record['outputs'].get(os.path.relpath(path, ROOT))
+            for path in step.outputs
+        )
+
+    def _save_state(self):
+        os.makedirs(BUILD_FOLDER, exist_ok=True)
+        with open(STATE_PATH + '.tmp', 'w', encoding='utf-8') as f:
+            json.dump(self.state, f, indent=1)
+        os.replace(STATE_PATH + '.tmp', STATE_PATH)
+
+    def build(self):
+        """按顺序执行各步骤，返回失败（或因上游失败而未执行）的步骤名列表。"""
+        os.makedirs(BUILD_FOLDER, exist_ok=True)
+        failed = []
+        for step in self.steps.values():
+            upstream = {self.producers[path] for path in step.inputs if path in self.producers}
+            if upstream & set(failed):
+                print(f'{step.name}: 上游失败，未执行')
+                failed.append(step.name)
+                continue
+            try:
+                key = self._step_key(step)
+                if self._is_up_to_date(step, key):
+                    print(f'{step.name}: 没有变化，跳过')
+                    continue
+                start = time.perf_counter()
+                self.values[step.name] = step.run(self)
+                self.state['steps'][step.name] = {'key': key, 'outputs': self._relative_hashes(step.outputs)}
+                print(f'{step.name}: 完成，{time.perf_counter() - start:.2f} 秒')
+            except Exception:
+                traceback.print_exc()
+                print(f'{step.name}: 失败')
+                self.state['steps'].pop(step.name, None)
+                failed.append(step.name)
+            self._save_state()
+        return failed
+
+
+def run_names_base(builder):
+    table = build_names_json.build_names_table(NAMES_TXT_PATH, builder.workers)
+    _write_zlib(NAMES_BASE_PATH, table.pack())
+    return table
+
+
+def load_names_base():
+    with open(NAMES_BASE_PATH, 'rb') as f:
+        return NamesTable.unpack(zlib.decompress(f.read()))
+
+
+def run_ucd(builder):
+    ucd = supply_info.read_ucd(UCD_XML_PATH)
+    _write_zlib(UCD_CACHE_PATH, msgpack.packb({'chars': ucd['chars'], 'variants': ucd['variants']}))
+    _write_zlib(TOOL_FILES['Versions'], msgpack.packb(ucd['versions']))
+    _write_zlib(TOOL_FILES['CommonNames'], msgpack.packb(ucd['common_names']))
+    return ucd
+
+
+def load_ucd():
+    ucd = _read_zlib(UCD_CACHE_PATH)
+    ucd['common_names'] = _read_zlib(TOOL_FILES['CommonNames'], use_list=False)
+    return ucd
+
+
+def run_names(builder):
+    names_list = supply_info.merge_ucd(builder.get('names_base').to_entries(), builder.get('ucd'))
+    table = NamesTable.from_entries(names_list)
+    _write_zlib(TOOL_FILES['NamesList'], table.pack())
+    return table
+
+
+def load_names():
+    with open(TOOL_FILES['NamesList'], 'rb') as f:
+        return NamesTable.unpack(zlib.decompress(f.read()))
+
+
+def run_defined(builder):
+    codes = build_defined_character_list.build_defined_list(NAMES_TXT_PATH, builder.workers)
+    _write_zlib(TOOL_FILES['DefinedCharacterList'], msgpack.packb(codes))
+    return codes
+
+
+def run_fallback(builder):
+    font_codes = {
+        font_name: builder.cmap_codes(build_font_fallback.get_font_path(font_name))
+        for font_name in build_font_fallback.fonts
+    }
+    res, missing = build_font_fallback.build_font_fallback(
+        font_codes, builder.get('defined'), builder.get('names'), builder.get('ucd')['common_names']
+    )
+    _write_zlib(TOOL_FILES['FontFallback'], msgpack.packb(res))
+    build_font_fallback.print_missing(missing)
+
+
+def run_compiled(builder):
+    unicode_data.compile_data()
+
+
+STEPS = [
+    Step('names_base', _code('MakeFileTools/build_names_json.py', 'MakeFileTools/names_list_parser.py', 'names_table.py'),
+         [NAMES_TXT_PATH], [NAMES_BASE_PATH], run_names_base, load_names_base),
+    Step('ucd', _code('MakeFileTools/supply_info.py'),
+         [UCD_XML_PATH], [UCD_CACHE_PATH, TOOL_FILES['Versions'], TOOL_FILES['CommonNames']], run_ucd, load_ucd),
+    Step('names', _code('MakeFileTools/supply_info.py', 'names_table.py'),
+         [NAMES_BASE_PATH, UCD_CACHE_PATH], [TOOL_FILES['NamesList']], run_names, load_names),
+    Step('defined', _code('MakeFileTools/build_defined_character_list.py', 'MakeFileTools/names_list_parser.py'),
+         [NAMES_TXT_PATH], [TOOL_FILES['DefinedCharacterList']], run_defined,
+         lambda: _read_zlib(TOOL_FILES['DefinedCharacterList'])),
+    Step('fallback', _code('MakeFileTools/build_font_fallback.py', 'names_table.py'),
+         [TOOL_FILES['DefinedCharacterList'], TOOL_FILES['NamesList'], TOOL_FILES['CommonNames'],
+          *(build_font_fallback.get_font_path(font_name) for font_name in build_font_fallback.fonts)],
+         [TOOL_FILES['FontFallback']], run_fallback),
+    Step('compiled', _code('unicode_data.py', 'names_table.py'),
+         list(TOOL_FILES.values()),
+         [os.path.join(unicode_data.COMPILED_FOLDER, name) for name in unicode_data.COMPILED_NAMES], run_compiled),
+]
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='按依赖关系增量地重新生成 ToolFiles，输入没有变化的步骤会被跳过。')
+    parser.add_argument('-j', '--workers', type=int, default=1,
+                        help='解析 NamesList.txt 的进程数，默认为 1（逐行流式解析）。')
+    parser.add_argument('-f', '--force', action='store_true',
+                        help='忽略运行记录，重新执行所有步骤。')
+    args = parser.parse_args()
+
+    failed = Builder(STEPS, args.workers, args.force).build()
+    if failed:
+        print(f'未完成的步骤：{", ".join(failed)}')
+        sys.exit(1)
@@ -1,36 +1,42 @@
 import os
-import re
 import msgpack
 import zlib
+import argparse
+
+from names_list_parser import Block, parse_file
 
 CUR_FOLDER = os.path.dirname(__file__)
 NAMES_LIST_PATH = os.path.join(os.path.dirname(CUR_FOLDER), 'data', 'NamesList.txt')
 OUT_PATH = os.path.join(os.path.dirname(CUR_FOLDER), 'ToolFiles', 'DefinedCharacterList.mp.zlib')
-UNICODE_RE = re.compile(r"^([0-9a-fA-F]|10)?[0-9a-fA-F]{0,4}$")
-
-res = set()
-
-with open(NAMES_LIST_PATH) as f:
-    for line in f.readlines():
-        line = line[:-1]
-        if line.startswith('@@\t'):
-            block_start, block_name, block_end = line.split('\t')[1:]
-            if (
-                block_name.startswith('CJK Unified Ideographs') or
-                block_name == 'Hangul Syllables' or
-                block_name == 'Tangut' or
-                block_name == 'Tangut Supplement'
-            ):
-                res.update(range(int(block_start, 16), int(block_end, 16) + 1))
-        if (
-            line and
-            not line.startswith('\t') and
-            len(line.split('\t')) == 2 and
-            UNICODE_RE.search(line.split('\t')[0])
-        ):
-            code, name, *_ = line.split('\t')
-            if name.startswith('<'): continue
-            res.add(int(code, 16))
-
-with open(OUT_PATH, 'wb') as f:
-    f.write(zlib.compress(msgpack.packb(sorted(list(res)))))
+
+
+def is_range_block(block_name):
+    # 这些区块在 NamesList 中没有逐个列出字符，整个区块都视为已定义
+    return (
+        block_name.startswith('CJK Unified Ideographs') or
+        block_name == 'Hangul Syllables' or
+        block_name == 'Tangut' or
+        block_name == 'Tangut Supplement'
+    )
+
+
+def build_defined_list(path=NAMES_LIST_PATH, workers=1):
+    """已定义字符的码位，升序列表。"""
+    res = set()
+    for record in parse_file(path, workers):
+        if isinstance(record, Block):
+            if is_range_block(record.name):
+                res.update(range(record.start, record.end + 1))
+        elif not record.name.startswith('<'):
+            res.add(record.code)
+    return sorted(res)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='由 data/NamesList.txt 生成 ToolFiles/DefinedCharacterList.mp.zlib。')
+    parser.add_argument('-j', '--workers', type=int, default=1,
+                        help='解析 NamesList.txt 的进程数，默认为 1（逐行流式解析）。')
+    args = parser.parse_args()
+
+    with open(OUT_PATH, 'wb') as f:
+        f.write(zlib.compress(msgpack.packb(build_defined_list(NAMES_LIST_PATH, args.workers))))
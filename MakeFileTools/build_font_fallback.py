@@ -1,4 +1,5 @@
 import os
+import sys
 import json
 from fontTools.ttLib import TTFont
 import msgpack
@@ -9,15 +10,9 @@ DEFINED_CHARACTER_LIST_PATH = os.path.join(os.path.dirname(CUR_FOLDER), 'ToolFil
 NAMES_LIST_PATH = os.path.join(os.path.dirname(CUR_FOLDER), 'ToolFiles', 'NamesList.mp.zlib')
 COMMON_NAMES_PATH = os.path.join(os.path.dirname(CUR_FOLDER), 'ToolFiles', 'CommonNames.mp.zlib')
 OUT_PATH = os.path.join(os.path.dirname(CUR_FOLDER), 'ToolFiles', 'FontFallback.mp.zlib')
+sys.path.insert(0, os.path.dirname(os.path.abspath(CUR_FOLDER)))
 
-with (
-    open(DEFINED_CHARACTER_LIST_PATH, 'rb') as dclf,
-    open(NAMES_LIST_PATH, 'rb') as nlf,
-    open(COMMON_NAMES_PATH, 'rb') as cnf
-):
-    DEFINED_CHARACTER_LIST = set(msgpack.unpackb(zlib.decompress(dclf.read())))
-    NAMES_LIST = msgpack.unpackb(zlib.decompress(nlf.read()), strict_map_key=False)
-    COMMON_NAMES = msgpack.unpackb(zlib.decompress(cnf.read()), strict_map_key=False, use_list=False)
+from names_table import NamesTable
 
 NOT_CHAR = [
     0xFFFE, 0xFFFF, 0x1FFFE, 0x1FFFF, 0x2FFFE,
@@ -30,64 +25,90 @@ NOT_CHAR = [
 ]
 NOT_CHAR.extend(range(0xFDD0, 0xFDF0))
 
-def get_char_name(code):
+fonts: list[str] = [
+    'Ctrl-Ctrl',
+    'PlangothicP1-Regular',
+    'PlangothicP2-Regular',
+    'NotoSansSC',
+    'NotoEmoji-Regular',
+    'NotoSansSuper',
+    'NotoUnicode-7.3',
+    'MonuTemp-0.920',
+]
+
+
+def get_font_path(font_name):
+    return os.path.abspath(os.path.join(os.path.dirname(CUR_FOLDER), 'fonts', font_name + '.ttf'))
+
+
+def read_cmap_codes(path):
+    """字体 cmap 中的全部码位。"""
+    font: TTFont = TTFont(path)
+    cmap: dict[int, str] = font.getBestCmap()
+    return list(cmap.keys())
+
+
+def get_char_name(code, names_list, common_names):
     if code in NOT_CHAR:
         return f'<not a character-{code:04X}>'
     if 0xD800 <= code <= 0xDFFF:
         return f'SURROGATE-{code:04X}'
-    name = NAMES_LIST.get(
-        str(code),
-        {'name': None}
-    )['name']
-    
+    name = names_list.get_name(code)
+
     if name is not None:
         return name
     else:
-        for k, v in COMMON_NAMES.items():
+        for k, v in common_names.items():
             s, e = k
             if s <= code <= e:
                 return v.replace('#', f'{code:04X}')
-    
+
     return f'<undefined character-{code:04X}>'
 
-def is_control(code):
-    if get_char_name(code).startswith('<control'):
-        return True
-    return False
 
+def build_font_fallback(font_codes, defined_character_list, names_list, common_names):
+    """
+    font_codes 为 {字体名: cmap 中的码位}，按 fonts 的优先级顺序。
+    返回 ({字体名: 由该字体显示的码位}, 无法显示的已定义字符的集合)。
+    """
+    defined_character_list = set(defined_character_list)
 
-def is_reserved(code):
-    if get_char_name(code).startswith('<reserved'):
-        return True
-    return False
+    def is_control(code):
+        return get_char_name(code, names_list, common_names).startswith('<control')
 
-fonts: list[str] = [
-    'Ctrl-Ctrl',
-    'PlangothicP1-Regular',
-    'PlangothicP2-Regular',
-    'NotoSansSC',
-    'NotoEmoji-Regular',
-    'NotoSansSuper',
-    'NotoUnicode-7.3',
-    'MonuTemp-0.920',
-]
+    def is_reserved(code):
+        return get_char_name(code, names_list, common_names).startswith('<reserved')
 
-already_can_display_codes: set[int] = set()
-res: dict[str, list[int]] = {}
+    already_can_display_codes: set[int] = set()
+    res: dict[str, list[int]] = {}
 
-for path in fonts:
-    abs_path: str = os.path.abspath(
-        os.path.join(os.path.dirname(CUR_FOLDER), 'fonts', path + '.ttf')
-    )
-    font: TTFont = TTFont(abs_path)
-    cmap: dict[int, str] = font.getBestCmap()
-    codes = cmap.keys()
-    need_codes = list(filter(lambda code: code not in already_can_display_codes and (code in DEFINED_CHARACTER_LIST or is_control(code) or is_reserved(code)), codes))
-    already_can_display_codes |= set(need_codes)
-    res[path] = list(need_codes)
+    for font_name, codes in font_codes.items():
+        need_codes = list(filter(lambda code: code not in already_can_display_codes and (code in defined_character_list or is_control(code) or is_reserved(code)), codes))
+        already_can_display_codes |= set(need_codes)
+        res[font_name] = list(need_codes)
+
+    return res, defined_character_list - already_can_display_codes
+
+
+def print_missing(missing):
+    print('无法显示的字符：')
+    print(sorted(map(lambda c: hex(c)[2:], list(missing))))
+
+
+if __name__ == '__main__':
+    with (
+        open(DEFINED_CHARACTER_LIST_PATH, 'rb') as dclf,
+        open(NAMES_LIST_PATH, 'rb') as nlf,
+        open(COMMON_NAMES_PATH, 'rb') as cnf
+    ):
+        DEFINED_CHARACTER_LIST = msgpack.unpackb(zlib.decompress(dclf.read()))
+        NAMES_LIST = NamesTable.unpack(zlib.decompress(nlf.read()))
+        COMMON_NAMES = msgpack.unpackb(zlib.decompress(cnf.read()), strict_map_key=False, use_list=False)
+
+    font_codes = {font_name: read_cmap_codes(get_font_path(font_name)) for font_name in fonts}
+    res, missing = build_font_fallback(font_codes, DEFINED_CHARACTER_LIST, NAMES_LIST, COMMON_NAMES)
 
-with open(OUT_PATH, 'wb') as f:
-    f.write(zlib.compress(msgpack.packb(res)))
+    with open(OUT_PATH, 'wb') as f:
+        f.write(zlib.compress(msgpack.packb(res)))
 
-print('无法显示的字符：')
-print(sorted(map(lambda c: hex(c)[2:], list(DEFINED_CHARACTER_LIST - set(already_can_display_codes)))))
+    print_missing(missing)
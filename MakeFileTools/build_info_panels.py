@@ -0,0 +1,43 @@
+import os
+import sys
+import argparse
+
+CUR_FOLDER = os.path.dirname(__file__)
+sys.path.insert(0, os.path.dirname(os.path.abspath(CUR_FOLDER)))
+
+import unicode_data
+import uni_flash
+from info_panel import get_panel_lines, write_panel_store
+
+
+def get_wrap_widths(width, percent_font):
+    """
+    宽度为 width 的视频中信息栏的折行宽度，与 generate_an_image 中的 percent_left - 15 相同。
+    它随右上角百分比文本的整数位数（1~3 位）变化，因此每种视频宽度最多有三种。
+    """
+    return sorted({
+        uni_flash._MEASURE_DRAW.textbbox((width - 15, 0), percent, font=percent_font, anchor='rt')[0] - 15
+        for percent in (' 0.00%', ' 00.00%', ' 100.00%')
+    })
+
+
+parser = argparse.ArgumentParser(description='预先折好左上角信息栏的文本，供 uni_flash.py 直接查表。')
+parser.add_argument('-wt', '--widths', type=int, nargs='*', default=[1920],
+                    help='视频宽度列表，默认 1920。')
+args = parser.parse_args()
+
+info_fonts = uni_flash.load_info_fonts()
+top_font = info_fonts['top']
+panel_lines = {}
+for code in unicode_data.get_data().names.codes:
+    lines = get_panel_lines(unicode_data.get_names_entry(code))
+    if lines:
+        panel_lines[code] = lines
+
+for width in args.widths:
+    for wrap_width in get_wrap_widths(width, info_fonts['middle_bottom']):
+        write_panel_store(top_font, wrap_width, {
+            code: '\n'.join(uni_flash.auto_width(line, top_font, wrap_width) for line in lines)
+            for code, lines in panel_lines.items()
+        })
+        print(f'宽度 {width}，折行宽度 {wrap_width}：{len(panel_lines)} 个字符')
@@ -1,9 +1,15 @@
 import os
-import msgpack
+import sys
 import zlib
 import re
+import argparse
 
 CUR_FOLDER = os.path.dirname(__file__)
+sys.path.insert(0, os.path.dirname(os.path.abspath(CUR_FOLDER)))
+
+from names_table import NamesTable
+from names_list_parser import Character, parse_file
+
 NAMES_LIST_PATH = os.path.join(os.path.dirname(CUR_FOLDER), 'data', 'NamesList.txt')
 OUT_PATH = os.path.join(os.path.dirname(CUR_FOLDER), 'ToolFiles', 'NamesList.mp.zlib')
 CTRL_NAME = {
@@ -18,107 +24,53 @@ CTRL_NAME = {
 }
 
 
-def edit_reserved(o):
-    return (f"<reserved-{o.id:04X}, " +
-            f"cross references: {o.xref[0]}>")
+UNICODE_RE = re.compile(r"^([0-9a-fA-F]|10)?[0-9a-fA-F]{0,4}$")
 
 
-UNICODE_RE = re.compile(r"^([0-9a-fA-F]|10)?[0-9a-fA-F]{0,4}$")
+def format_xref(text):
+    return "U+" + (text.split(' ')[-1][:-1] if text[0] == '(' else text).replace('\'', '"')
+
+
+def format_compat(text):
+    return ' '.join(
+        "U+" + s if UNICODE_RE.search(s) else s
+        for s in text.split(' ')
+        if re.match('^([0-9A-F]+|<.*>)$', s)
+    ).replace('\'', '"')
+
+
+def serialise(character):
+    xref = [format_xref(text) for text in character.xref]
+    name = character.name
+    if name == '<reserved>':
+        name = f'<reserved-{character.code:04X}, cross references: {xref[0]}>'
+    elif name == '<control>':
+        name = f'<control-{CTRL_NAME[character.code]}>'
+    return {"name": name,
+            "comment": [text.replace('\'', '"') for text in character.comment],
+            "alias": [],
+            "formal alias": [],
+            "cross references": xref,
+            "variation": [],
+            "decomposition": [],
+            "compat mapping": [format_compat(text) for text in character.compat]}
+
+
+def iter_entries(records):
+    for record in records:
+        if isinstance(record, Character) and record.name != '<not a character>':
+            yield record.code, serialise(record)
+
+
+def build_names_table(path=NAMES_LIST_PATH, workers=1):
+    return NamesTable.from_entries(iter_entries(parse_file(path, workers)))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='由 data/NamesList.txt 生成 ToolFiles/NamesList.mp.zlib。')
+    parser.add_argument('-j', '--workers', type=int, default=1,
+                        help='解析 NamesList.txt 的进程数，默认为 1（逐行流式解析）。')
+    args = parser.parse_args()
 
-characters: dict[int, "OneCharacter"] = {}
-
-class OneCharacter:
-    id = None
-    name = None
-    comment: list[str] = []
-    xref: list[str] = []
-    compat: list[str] = []
-
-    def __init__(self, code, name):
-        self.id = int(code, 16)
-        self.name = name
-        self.comment = []
-        self.xref = []
-        self.compat = []
-
-    def update(self):
-        global characters
-        characters[self.id] = self
-    
-    def serialise(self):
-        return {"code": "U+" + hex(self.id)[2:].upper().zfill(4),
-                "name": (edit_reserved(self)
-                         if (n := self.name) == "<reserved>"
-                         else n),
-                "comment": self.comment,
-                "alias": [],
-                "formal alias": [],
-                "cross references": self.xref,
-                "variation": [],
-                "decomposition": [],
-                "compat mapping": self.compat}
-
-
-with open(NAMES_LIST_PATH) as f:
-    current = None
-    for line in f.readlines():
-        def oneline(line):
-            global current
-            if len(line) == 0:
-                return
-            elif line[0] in ['@', ';']:
-                return
-            elif line[0] == '\t':
-                if line[1] == '%':
-                    return
-                if line[1] == '=':
-                    return
-                if line[1] == ':':
-                    return
-                if line[1] == '~':
-                    return
-                if current is None:
-                    return
-                if len(line) < 3:
-                    print(f'Malformed line: {line}')
-                    return
-                if line[1] == '\t':
-                    return
-                if line[1] == '*':
-                    current.comment.append(line[3:].replace('\'', '"'))
-                if line[1] == 'x':
-                    current.xref.append("U+" + (
-                        line.split(' ')[-1][:-1]
-                        if line[3] == '('
-                        else line[3:]).replace('\'', '"')
-                    )
-                if line[1] == '#':
-                    current.compat.append(
-                        ' '.join((
-                            "U+" + s
-                            if UNICODE_RE.search(s)
-                            else s
-                        ) for s in line[3:].split(' ')
-                          if re.match('^([0-9A-F]+|<.*>)$', s))
-                        .replace('\'', '"')
-                    )
-            else:
-                if current is not None:
-                    current.update()
-                tokens = line.split('\t')
-                if len(tokens) != 2:
-                    print(f'Malformed line: {line}')
-                    return
-                if tokens[1] == '<not a character>':
-                    current = None
-                    return
-                if tokens[1] == '<control>':
-                    tokens[1] = ('<control-' +
-                                 f'{CTRL_NAME[int(tokens[0], 16)]}>')
-                current = OneCharacter(tokens[0], tokens[1])
-        oneline(line.replace("\n", ""))
-        if current is not None:
-            current.update()
-
-with open(OUT_PATH, "wb") as f:
-    f.write(zlib.compress(msgpack.packb({k: v.serialise() for k, v in characters.items()})))
+    with open(OUT_PATH, "wb") as f:
+        f.write(zlib.compress(build_names_table(NAMES_LIST_PATH, args.workers).pack()))
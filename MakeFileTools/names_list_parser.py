@@ -0,0 +1,112 @@
+"""
+data/NamesList.txt 的流式解析，供 build_names_json.py 与 build_defined_character_list.py 共用。
+
+parse_lines 逐行读取，每当一条记录结束就产出一条，不在内存中保存整个文件的结果：
+  Block      @@ 区块标题行；
+  Character  字符行及其后的注释行（* 说明、x 交叉参考、# 兼容性映射，保留原文）。
+字符的注释行到下一个字符行、@@ 区块标题行或 @ 小标题行为止（@+ 提示行可以出现在字符的注释中间，不结束记录）；
+标题行之后、下一个字符行之前的注释属于标题，不归入前一个字符。
+因此以 @@ 区块为单位分别解析与整体解析的结果相同，parse_file 据此把文件按区块切分，在进程池中并行解析。
+"""
+from concurrent.futures import ProcessPoolExecutor
+
+import re
+
+BLOCK_HEADER = '@@\t'
+NOTICE = '@+'
+CODE_RE = re.compile(r"^([0-9a-fA-F]|10)?[0-9a-fA-F]{4}$")
+# 每个工作进程平均分到的批数，批数多一些可以让各进程的负载更均匀
+BATCHES_PER_WORKER = 4
+
+
+class Block:
+    __slots__ = ('start', 'name', 'end')
+
+    def __init__(self, start, name, end):
+        self.start = start
+        self.name = name
+        self.end = end
+
+
+class Character:
+    __slots__ = ('code', 'name', 'comment', 'xref', 'compat')
+
+    def __init__(self, code, name):
+        self.code = code
+        self.name = name
+        self.comment = []
+        self.xref = []
+        self.compat = []
+
+
+def parse_lines(lines):
+    """lines 为 NamesList.txt 的各行（可以带换行符），按文件中的顺序产出 Block 与 Character。"""
+    current = None
+    for line in lines:
+        line = line.rstrip('\n')
+        if not line or line[0] == ';' or line.startswith(NOTICE):
+            continue
+        if line[0] == '@':
+            if current is not None:
+                yield current
+                current = None
+            if line.startswith(BLOCK_HEADER):
+                start, name, end = line.split('\t')[1:]
+                yield Block(int(start, 16), name, int(end, 16))
+        elif line[0] == '\t':
+            if current is None or len(line) < 2 or line[1] not in '*x#':
+                continue
+            if len(line) < 3:
+                print(f'Malformed line: {line}')
+            elif line[1] == '*':
+                current.comment.append(line[3:])
+            elif line[1] == 'x':
+                current.xref.append(line[3:])
+            else:
+                current.compat.append(line[3:])
+        else:
+            tokens = line.split('\t')
+            if len(tokens) != 2 or not CODE_RE.search(tokens[0]):
+                print(f'Malformed line: {line}')
+                continue
+            if current is not None:
+                yield current
+            current = Character(int(tokens[0], 16), tokens[1])
+    if current is not None:
+        yield current
+
+
+def _parse_text(text):
+    return list(parse_lines(text.splitlines()))
+
+
+def split_blocks(text, batches):
+    """把 NamesList.txt 的全文在 @@ 区块标题处切成大约 batches 段，每段都从区块标题（或文件开头）开始。"""
+    starts = [0] + [m.start() + 1 for m in re.finditer('\n' + BLOCK_HEADER, text)]
+    target = len(text) / batches
+    pieces = []
+    begin = 0
+    for start in starts[1:]:
+        if start - begin >= target:
+            pieces.append(text[begin:start])
+            begin = start
+    pieces.append(text[begin:])
+    return pieces
+
+
+def parse_file(path, workers=1):
+    """
+    解析 path，按文件中的顺序产出 Block 与 Character。
+    workers 大于 1 时把文件按区块切分，用 workers 个进程并行解析，每解析完一段就依次产出；否则在本进程中逐行流式解析。
+    """
+    if workers <= 1:
+        with open(path, encoding='utf-8') as f:
+            yield from parse_lines(f)
+        return
+
+    with open(path, encoding='utf-8') as f:
+        text = f.read()
+    with ProcessPoolExecutor(workers) as executor:
+        for records in executor.map(_parse_text, split_blocks(text, workers * BATCHES_PER_WORKER)):
+            yield from records
+
@@ -2,34 +2,20 @@ from lxml import etree
 import msgpack
 import zlib
 import os
+import sys
 
 CUR_FOLDER = os.path.dirname(__file__)
+sys.path.insert(0, os.path.dirname(os.path.abspath(CUR_FOLDER)))
+
+from names_table import NamesTable
+
 UCD_XLM_PATH = os.path.join(os.path.dirname(CUR_FOLDER), 'data', 'ucd.nounihan.flat.xml')
 NAMES_LIST_PATH = os.path.join(os.path.dirname(CUR_FOLDER), 'ToolFiles', 'NamesList.mp.zlib')
 VERSIONS_PATH = os.path.join(os.path.dirname(CUR_FOLDER), 'ToolFiles', 'Versions.mp.zlib')
 COMMON_NAMES_PATH = os.path.join(os.path.dirname(CUR_FOLDER), 'ToolFiles', 'CommonNames.mp.zlib')
 
-with open(NAMES_LIST_PATH, 'rb') as f:
-    names_list = msgpack.unpackb(zlib.decompress(f.read()), strict_map_key=False)
-
-versions = {
-    'single': {},
-    'range': {}
-}
-common_names = {}
-
 namespaces = {'ucd': 'http://www.unicode.org/ns/2003/ucd/1.0'}
 
-context = etree.iterparse(
-    UCD_XLM_PATH, 
-    events=('end',), 
-    tag=(
-        '{http://www.unicode.org/ns/2003/ucd/1.0}char',
-        '{http://www.unicode.org/ns/2003/ucd/1.0}surrogate',
-        '{http://www.unicode.org/ns/2003/ucd/1.0}standardized-variant'
-    )
-)
-
 alias_type_translator = {
     'abbreviation': '缩写',
     'alternate': '备用',
@@ -38,96 +24,156 @@ alias_type_translator = {
     'figment': '虚构的'
 }
 
-for event, elem in context:
-    if elem.tag == '{http://www.unicode.org/ns/2003/ucd/1.0}char':
-        name_aliases = elem.findall('ucd:name-alias', namespaces)
-        
-        cp = elem.get('cp')
-        if cp is not None:
-            cp_int = int(cp, 16)
-            versions['single'][cp_int] = elem.get('age')
-            if str(cp_int) not in names_list:
-                character = {
-                    'code': f'U+{cp}',
-                    'name': elem.get('na').replace('#', cp),
-                    'comment': [],
-                    'alias': [],
-                    'formal alias': [],
-                    'cross references': [],
-                    'variation': [],
-                    'decomposition': [],
-                    'compat mapping': []
-                }
-                names_list[cp_int] = character
+
+def read_ucd(path):
+    """
+    读取 ucd.nounihan.flat.xml 中用到的信息，返回 dict：
+      chars     [[码位的十六进制, na, [[别名, 别名类型], ...], dm], ...]，按文件中的顺序；
+      variants  [[[码位的十六进制, ...], desc], ...]，按文件中的顺序；
+      versions、common_names  与 Versions.mp.zlib、CommonNames.mp.zlib 的内容相同。
+    结果只取决于 XML 文件，与 NamesList 无关，可以缓存下来供 merge_ucd 使用。
+    """
+    chars = []
+    variants = []
+    versions = {
+        'single': {},
+        'range': {}
+    }
+    common_names = {}
+
+    context = etree.iterparse(
+        path,
+        events=('end',),
+        tag=(
+            '{http://www.unicode.org/ns/2003/ucd/1.0}char',
+            '{http://www.unicode.org/ns/2003/ucd/1.0}surrogate',
+            '{http://www.unicode.org/ns/2003/ucd/1.0}standardized-variant'
+        )
+    )
+
+    for event, elem in context:
+        if elem.tag == '{http://www.unicode.org/ns/2003/ucd/1.0}char':
+            cp = elem.get('cp')
+            if cp is not None:
+                versions['single'][int(cp, 16)] = elem.get('age')
+                name_aliases = [
+                    [name_alias.get('alias'), name_alias.get('type')]
+                    for name_alias in elem.findall('ucd:name-alias', namespaces)
+                ]
+                chars.append([cp, elem.get('na'), name_aliases, elem.get('dm')])
             else:
-                character = names_list[str(cp_int)]
-                
-            for name_alias in name_aliases:
-                alias_type = name_alias.get('type')
-                if alias_type == 'correction':
-                    character['formal alias'].append(name_alias.get('alias') + '(' + alias_type_translator[alias_type] + ')')
-                else:
-                    character['alias'].append(name_alias.get('alias') + '(' + alias_type_translator[alias_type] + ')')
-            
-            if elem.get('na'):
-                character['name'] = elem.get('na').replace('#', cp)
-            dm = elem.get('dm')
-            character['decomposition'] = dm.split() if dm != '#' else []
-        else:
-            fcp = elem.get('first-cp')
-            lcp = elem.get('last-cp')
-            
-            fcp_int = int(fcp, 16)
-            lcp_int = int(lcp, 16)
-            
-            name = elem.get('na')
-            if fcp == 'E000' or fcp == 'F0000' or fcp == '100000':
-                name = 'PRIVATE USE-#'
-            
-            versions['range'][(fcp_int, lcp_int)] = elem.get('age')
-            common_names[(fcp_int, lcp_int)] = name
-    elif elem.tag == '{http://www.unicode.org/ns/2003/ucd/1.0}surrogate':
-        cp = elem.get('cp')
-        if cp is not None:
-            cp_int = int(cp, 16)
-            versions['single'][cp_int] = elem.get('age')
+                fcp = elem.get('first-cp')
+                lcp = elem.get('last-cp')
+
+                fcp_int = int(fcp, 16)
+                lcp_int = int(lcp, 16)
+
+                name = elem.get('na')
+                if fcp == 'E000' or fcp == 'F0000' or fcp == '100000':
+                    name = 'PRIVATE USE-#'
+
+                versions['range'][(fcp_int, lcp_int)] = elem.get('age')
+                common_names[(fcp_int, lcp_int)] = name
+        elif elem.tag == '{http://www.unicode.org/ns/2003/ucd/1.0}surrogate':
+            cp = elem.get('cp')
+            if cp is not None:
+                cp_int = int(cp, 16)
+                versions['single'][cp_int] = elem.get('age')
+            else:
+                fcp = elem.get('first-cp')
+                lcp = elem.get('last-cp')
+
+                fcp_int = int(fcp, 16)
+                lcp_int = int(lcp, 16)
+
+                versions['range'][(fcp_int, lcp_int)] = elem.get('age')
+        elif elem.tag == '{http://www.unicode.org/ns/2003/ucd/1.0}standardized-variant':
+            variants.append([elem.get('cps').split(), elem.get('desc')])
+
+        elem.clear()
+        while elem.getprevious() is not None:
+            del elem.getparent()[0]
+
+    return {
+        'chars': chars,
+        'variants': variants,
+        'versions': versions,
+        'common_names': common_names
+    }
+
+
+def find_common_name(common_names, code):
+    """code 所在的 CommonNames 区间的名称（# 换成码位），不在任何区间内时返回空字符串。"""
+    for (s, e), name in common_names.items():
+        if s <= code <= e:
+            return name.replace('#', f'{code:04X}')
+    return ''
+
+
+def merge_ucd(names_list, ucd):
+    """把 read_ucd 的结果补充进 names_list（{码位: 条目 dict}，build_names_json.py 的结果），就地修改。"""
+    for cp, na, name_aliases, dm in ucd['chars']:
+        cp_int = int(cp, 16)
+        if cp_int not in names_list:
+            character = {
+                'code': f'U+{cp}',
+                'name': na.replace('#', cp),
+                'comment': [],
+                'alias': [],
+                'formal alias': [],
+                'cross references': [],
+                'variation': [],
+                'decomposition': [],
+                'compat mapping': []
+            }
+            names_list[cp_int] = character
         else:
-            fcp = elem.get('first-cp')
-            lcp = elem.get('last-cp')
-            
-            fcp_int = int(fcp, 16)
-            lcp_int = int(lcp, 16)
-            
-            versions['range'][(fcp_int, lcp_int)] = elem.get('age')
-    elif elem.tag == '{http://www.unicode.org/ns/2003/ucd/1.0}standardized-variant':
-        cps = elem.get('cps').split()
-        variation_target = str(int(cps[0], 16))
-        desc = elem.get('desc')
+            character = names_list[cp_int]
+
+        for alias, alias_type in name_aliases:
+            if alias_type == 'correction':
+                character['formal alias'].append(alias + '(' + alias_type_translator[alias_type] + ')')
+            else:
+                character['alias'].append(alias + '(' + alias_type_translator[alias_type] + ')')
+
+        if na:
+            character['name'] = na.replace('#', cp)
+        character['decomposition'] = dm.split() if dm != '#' else []
+
+    for cps, desc in ucd['variants']:
+        variation_target = int(cps[0], 16)
+        variation = ' '.join(map(lambda c: 'U+' + c, cps)) + (f'({desc})' if desc else '')
         if variation_target in names_list:
-            names_list[variation_target]['variation'].append(' '.join(map(lambda c: 'U+' + c, cps)) + (f'({desc})' if desc else ''))
+            names_list[variation_target]['variation'].append(variation)
         else:
             character = {
                 'code': f'U+{cps[0]}',
-                'name': '{common_name}',
+                # 只出现在变体序列中的字符（如 CJK 统一表意文字）没有单独的名称，取 CommonNames 中的名称
+                'name': find_common_name(ucd['common_names'], variation_target),
                 'comment': [],
                 'alias': [],
                 'formal alias': [],
                 'cross references': [],
-                'variation': [' '.join(map(lambda c: 'U+' + c, cps)) + (f'({desc})' if desc else '')],
+                'variation': [variation],
                 'decomposition': [],
                 'compat mapping': []
             }
-            names_list[cp_int] = character
-    
-    elem.clear()
-    while elem.getprevious() is not None:
-        del elem.getparent()[0]
-
-with (
-    open(NAMES_LIST_PATH, 'wb') as nlf,
-    open(VERSIONS_PATH, 'wb') as vf,
-    open(COMMON_NAMES_PATH, 'wb') as cnf
-):
-    nlf.write(zlib.compress(msgpack.packb(names_list)))
-    vf.write(zlib.compress(msgpack.packb(versions)))
-    cnf.write(zlib.compress(msgpack.packb(common_names)))
+            names_list[variation_target] = character
+    return names_list
+
+
+if __name__ == '__main__':
+    with open(NAMES_LIST_PATH, 'rb') as f:
+        names_list = NamesTable.unpack(zlib.decompress(f.read())).to_entries()
+
+    ucd = read_ucd(UCD_XLM_PATH)
+    merge_ucd(names_list, ucd)
+
+    with (
+        open(NAMES_LIST_PATH, 'wb') as nlf,
+        open(VERSIONS_PATH, 'wb') as vf,
+        open(COMMON_NAMES_PATH, 'wb') as cnf
+    ):
+        nlf.write(zlib.compress(NamesTable.from_entries(names_list).pack()))
+        vf.write(zlib.compress(msgpack.packb(ucd['versions'])))
+        cnf.write(zlib.compress(msgpack.packb(ucd['common_names'])))
@@ -0,0 +1,123 @@
+"""
+make app（由 data/ 重新生成 ToolFiles）各步骤的耗时。
+步骤从 Makefile 的 app 目标中读取，-j 指定的每种进程数（即 make app JOBS=...）各测量 -r 次，取中位数。
+每次先清除增量构建的记录（.cache/build）与编译结果完整重建（cold），再在没有任何改动的情况下运行一次（warm）。
+为了不改动当前的 ToolFiles，在临时目录中运行：复制各脚本与 ToolFiles，data 与 fonts 使用符号链接（不支持时复制）。
+某一步失败时（例如 data 或 fonts 只是 Git LFS 的指针文件）照常记录耗时并标上 *，继续执行后面的步骤。
+"""
+import os
+import sys
+import json
+import glob
+import shutil
+import argparse
+import statistics
+import subprocess
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def get_app_steps(jobs):
+    """Makefile 中 app 目标的各条命令（参数列表），python 换成当前的解释器，$(JOBS) 换成 jobs。"""
+    steps = []
+    in_app = False
+    with open(os.path.join(ROOT, 'Makefile'), encoding='utf-8') as f:
+        for line in f:
+            if not line.startswith('\t'):
+                in_app = line.startswith('app:')
+                continue
+            if in_app:
+                args = line.strip().replace('$(JOBS)', str(jobs)).split()
+                if args[0] == 'python':
+                    args[0] = sys.executable
+                steps.append(args)
+    return steps
+
+
+def link_or_copy(src, dst):
+    try:
+        os.symlink(src, dst, target_is_directory=True)
+    except OSError:
+        shutil.copytree(src, dst)
+
+
+def prepare_tree(tmp):
+    for path in glob.glob(os.path.join(ROOT, '*.py')):
+        shutil.copy(path, tmp)
+    shutil.copytree(os.path.join(ROOT, 'MakeFileTools'), os.path.join(tmp, 'MakeFileTools'),
+                    ignore=shutil.ignore_patterns('__pycache__'))
+    shutil.copytree(os.path.join(ROOT, 'ToolFiles'), os.path.join(tmp, 'ToolFiles'),
+                    ignore=shutil.ignore_patterns('compiled'))
+    for name in ('data', 'fonts'):
+        if os.path.exists(os.path.join(ROOT, name)):
+            link_or_copy(os.path.join(ROOT, name), os.path.join(tmp, name))
+
+
+def run_steps(tmp, steps):
+    """依次运行各步骤，返回 {步骤名: (耗时, 是否成功)}。"""
+    times = {}
+    for args in steps:
+        name = os.path.basename(args[1])
+        start = time.perf_counter()
+        result = subprocess.run(args, cwd=tmp, capture_output=True, text=True)
+        times[name] = (time.perf_counter() - start, result.returncode == 0)
+    return times
+
+
+def median_times(runs):
+    return {
+        name: (statistics.median(run[name][0] for run in runs), all(run[name][1] for run in runs))
+        for name in runs[0]
+    }
+
+
+def measure(jobs, repeat):
+    """返回 {'cold': {步骤名: 耗时}, 'warm': {步骤名: 耗时}}。"""
+    cold, warm = [], []
+    with tempfile.TemporaryDirectory() as tmp:
+        prepare_tree(tmp)
+        steps = get_app_steps(jobs)
+        for _ in range(repeat):
+            for path in (os.path.join(tmp, '.cache', 'build'), os.path.join(tmp, 'ToolFiles', 'compiled')):
+                shutil.rmtree(path, ignore_errors=True)
+            cold.append(run_steps(tmp, steps))
+            warm.append(run_steps(tmp, steps))
+    return {'cold': median_times(cold), 'warm': median_times(warm)}
+
+
+def print_results(results):
+    names = list(next(iter(results.values())))
+    print(f'{"步骤":<34}' + ''.join(f'{jobs:>13}' for jobs in results))
+    for name in names:
+        print(f'{name:<36}' + ''.join(
+            f'{result[name][0] * 1000:>10.0f}ms' + (' ' if result[name][1] else '*')
+            for result in results.values()
+        ))
+    print(f'{"合计":<34}' + ''.join(
+        f'{sum(t for t, _ in result.values()) * 1000:>10.0f}ms ' for result in results.values()
+    ))
+    if not all(ok for result in results.values() for _, ok in result.values()):
+        print('* 以非零状态退出')
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='make app 数据重建各步骤的耗时')
+    parser.add_argument('-j', '--jobs', type=int, nargs='*', default=sorted({1, os.cpu_count() or 1}),
+                        help='测量的 JOBS（解析 NamesList.txt 的进程数），默认为 1 与 CPU 核数。')
+    parser.add_argument('-r', '--repeat', type=int, default=3,
+                        help='每种 JOBS 重复的次数，默认 3。')
+    parser.add_argument('-o', '--output', type=str,
+                        help='把结果保存为 JSON 文件。')
+    args = parser.parse_args()
+
+    results = {}
+    for jobs in args.jobs:
+        for scenario, times in measure(jobs, args.repeat).items():
+            results[f'JOBS={jobs} {scenario}'] = times
+    print_results(results)
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump({'cpu_count': os.cpu_count(), 'results': results}, f, ensure_ascii=False, indent=2)
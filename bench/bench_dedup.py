@@ -0,0 +1,66 @@
+"""
+给出 FrameDiffStats（-dd）的统计：与上一帧相同、只有局部变化的帧数，以及平均每帧变化的块占比，
+并测量 ffmpeg 编码器的编码耗时与文件大小。
+帧先用 render_frames 渲染好并缓存在内存中，只计时编码部分。全码位空间可用 -r 0 10FFFF -s N 抽样。
+"""
+import os
+import sys
+import time
+import shutil
+import argparse
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import uni_flash as uf
+from video_encoder import FFmpegWriter
+from frame_dedup import FrameDiffStats
+from bench_worker_init import DIMENSIONS, IMG_PROPS, OPTS
+
+
+def encode(frames, preset):
+    size = (IMG_PROPS['width'], IMG_PROPS['height'])
+    with tempfile.TemporaryDirectory() as tmp:
+        out_path = os.path.join(tmp, 'bench.mp4')
+        writer = FFmpegWriter(out_path, 15, size, preset=preset)
+        start = time.perf_counter()
+        for frame in frames:
+            writer.write(frame)
+        writer.release()
+        elapsed = time.perf_counter() - start
+        file_size = os.path.getsize(out_path)
+    return elapsed, file_size
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='逐帧变化统计与编码基准测试')
+    parser.add_argument('-r', '--rang', type=lambda v: int(v, 16), nargs=2,
+                        default=[0x40000, 0x400FF],
+                        help='测试的码位范围，不带0x的十六进制数，默认 40000 400FF（未定义字符）。')
+    parser.add_argument('-s', '--step', type=int, default=1,
+                        help='每隔多少个码位取一个连续的 64 帧片段，默认 1（不抽样）。')
+    parser.add_argument('-lt', '--last_type', type=int, choices=(0, 1, 2), default=0,
+                        help='最后字体的类型：0 无，1 LastResort，2 MonuLast，默认 0。')
+    parser.add_argument('-pre', '--preset', type=str, default='medium',
+                        help='ffmpeg 编码器的预设，默认 medium。')
+    args = parser.parse_args()
+    if not shutil.which('ffmpeg'):
+        sys.exit('未找到 ffmpeg。')
+
+    codes = range(args.rang[0], args.rang[1] + 1)
+    if args.step > 1:
+        codes = [code for start in codes[::args.step] for code in range(start, min(start + 64, codes.stop))]
+    groups, group_lens = uf.get_groups(codes)
+    opts = dict(OPTS, last_type=args.last_type)
+    uf.load_last_fonts(args.last_type)
+    stats = FrameDiffStats()
+    frames = []
+    for _, frame in uf.render_frames(codes, groups, group_lens, DIMENSIONS, IMG_PROPS, uf.load_info_fonts(), (), opts):
+        stats.add(frame)
+        frames.append(frame.copy())
+
+    report = stats.report()
+    print(f'{report["frames"]} 帧：相同 {report["identical"]}，局部更新 {report["partial"]}，完整更新 {report["full"]}，'
+          f'平均每帧变化的块 {report["mean_changed_blocks"] * 100:.2f}%')
+    elapsed, file_size = encode(frames, args.preset)
+    print(f'编码：{elapsed:7.2f} 秒，{file_size / 1024:9.1f} KiB')
@@ -0,0 +1,80 @@
+"""
+对比不同帧格式与编码器在“传输 + 编码”阶段的吞吐量（帧/秒）与文件大小：
+  gray：单通道帧直接交给 isColor=False 的 VideoWriter（opencv 编码器）；
+  bgr：每帧先用 cv2.cvtColor 扩展为三通道再写入（旧实现）；
+  ffmpeg-*：单通道帧经管道交给 ffmpeg 子进程（ffmpeg 编码器，需要安装 ffmpeg）。
+帧先用 render_frames 渲染好并缓存在内存中，只计时转换与编码部分。
+"""
+import os
+import sys
+import time
+import shutil
+import argparse
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import cv2
+import numpy as np
+
+import uni_flash as uf
+from video_encoder import FFmpegWriter
+from bench_worker_init import DIMENSIONS, IMG_PROPS, OPTS
+
+
+def encode(frames, rounds, open_writer, convert=None):
+    with tempfile.TemporaryDirectory() as tmp:
+        out_path = os.path.join(tmp, 'bench.mp4')
+        writer = open_writer(out_path)
+        start = time.perf_counter()
+        for _ in range(rounds):
+            for frame in frames:
+                writer.write(convert(frame) if convert else frame)
+        writer.release()
+        elapsed = time.perf_counter() - start
+        size = os.path.getsize(out_path)
+    return len(frames) * rounds / elapsed, size
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='帧格式与编码器的编码吞吐量基准测试')
+    parser.add_argument('-r', '--rang', type=lambda v: int(v, 16), nargs=2,
+                        default=[0x4E00, 0x4E3F],
+                        help='测试的码位范围，不带0x的十六进制数，默认 4E00 4E3F。')
+    parser.add_argument('-n', '--rounds', type=int, default=3,
+                        help='重复编码的轮数，默认 3。')
+    parser.add_argument('-pre', '--preset', type=str, default='medium',
+                        help='ffmpeg 编码器的预设，默认 medium。')
+    args = parser.parse_args()
+
+    codes = range(args.rang[0], args.rang[1] + 1)
+    groups, group_lens = uf.get_groups(codes)
+    frames = [
+        frame.copy() for _, frame in uf.render_frames(
+            codes, groups, group_lens, DIMENSIONS, IMG_PROPS,
+            uf.load_info_fonts(), (), OPTS
+        )
+    ]
+
+    fps = 15
+    size = (IMG_PROPS['width'], IMG_PROPS['height'])
+    fourcc = cv2.VideoWriter_fourcc(*'mp4v')
+    writers = {
+        'gray': (lambda path: cv2.VideoWriter(path, fourcc, fps, size, isColor=False), None),
+        'bgr': (
+            lambda path: cv2.VideoWriter(path, fourcc, fps, size, isColor=True),
+            lambda frame: cv2.cvtColor(frame, cv2.COLOR_GRAY2BGR)
+        ),
+    }
+    if shutil.which('ffmpeg'):
+        for codec in ('libx264', 'libx265'):
+            writers[f'ffmpeg-{codec}'] = (
+                lambda path, codec=codec: FFmpegWriter(path, fps, size, codec=codec, preset=args.preset),
+                None
+            )
+    else:
+        print('未找到 ffmpeg，跳过 ffmpeg 编码器。')
+
+    for name, (open_writer, convert) in writers.items():
+        encode_fps, file_size = encode(frames, args.rounds, open_writer, convert)
+        print(f'{name:>16}: {encode_fps:8.1f} 帧/秒，{file_size / 1024:8.1f} KiB')
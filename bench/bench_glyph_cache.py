@@ -0,0 +1,70 @@
+"""
+字形位图缓存（glyph_cache.GlyphCache）三种取法的耗时，并校验缓存的行为：
+  miss     未命中，用 FreeType 渲染并追加到本进程的 .part 文件；
+  pending  本进程已渲染过、尚未合并的字形，从 .part 读回；
+  merged   merge() 之后从 .bin 的 mmap 读取。
+同一文本第二次起不应再写 .part（-ul 时整个平面反复使用同一个 LastResort 字形），三种取法得到的遮罩必须相同。
+字形中包含 -um 会显示的孤立代理码位（U+D800–U+DFFF），它们不能按普通的 UTF-8 编码。
+"""
+import os
+import sys
+import time
+import glob
+import argparse
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from PIL import ImageFont
+
+import uni_flash as uf
+from glyph_cache import GlyphCache
+
+XY = (960, 540)
+SIZE = (1920, 1080)
+
+
+def part_size(cache_dir):
+    return sum(os.path.getsize(path) for path in glob.glob(os.path.join(cache_dir, '*.part')))
+
+
+def timeit(func, texts):
+    start = time.perf_counter()
+    res = [func(text) for text in texts]
+    return (time.perf_counter() - start) / len(texts), res
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='字形位图缓存的基准测试与校验')
+    parser.add_argument('-n', '--repeat', type=int, default=50,
+                        help='每个字形重复读取的次数，默认 50。')
+    args = parser.parse_args()
+
+    font = ImageFont.truetype(uf.INFO_FONT_PATH, uf.EXAMPLE_FONT_SIZE)
+    texts = [chr(code) for code in (*range(0x41, 0x5B), 0xD800, 0xDBFF, 0xDC00, 0xDFFF)]
+
+    with tempfile.TemporaryDirectory() as cache_dir:
+        cache = GlyphCache(cache_dir)
+        get = lambda text: cache.get(font, text, XY, SIZE)
+
+        miss_time, missed = timeit(get, texts)
+        size = part_size(cache_dir)
+        pending_time, pending = timeit(get, texts * args.repeat)
+        assert part_size(cache_dir) == size, '重复读取同一字形时 .part 文件变大了'
+        assert all(
+            a[0].tobytes() == b[0].tobytes() and a[1] == b[1]
+            for a, b in zip(missed * args.repeat, pending)
+        ), 'pending 读回的遮罩与渲染结果不一致'
+
+        cache.merge()
+        merged_time, merged = timeit(get, texts * args.repeat)
+        assert part_size(cache_dir) == 0, '合并之后的读取写入了 .part 文件'
+        assert all(
+            a[0].tobytes() == b[0].tobytes() and a[1] == b[1]
+            for a, b in zip(missed * args.repeat, merged)
+        ), '合并后读取的遮罩与渲染结果不一致'
+        cache.close()
+
+    print(f'{len(texts)} 个字形，.part 共 {size} 字节（每个字形只写一次）')
+    for name, elapsed in (('miss', miss_time), ('pending', pending_time), ('merged', merged_time)):
+        print(f'{name:>8}: {elapsed * 1e6:8.1f} 微秒/次')
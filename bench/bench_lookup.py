@@ -0,0 +1,97 @@
+"""
+对全部 0x110000 个码位测量字符信息查找的耗时：
+  get_char_name、get_char_version：当前基于编译数据（unicode_data）的实现；
+  *_linear：整体解包 .mp.zlib 后逐个遍历 CommonNames / Versions['range'] 的旧实现，用于对比，并校验两者结果一致。
+另外测量全范围快闪（约 400 个分组）时 get_group 每帧的耗时；旧的前缀和实现是 O(分组数²)，只抽样测量。
+"""
+import os
+import sys
+import time
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import msgpack
+import zlib
+
+import uni_flash as uf
+import unicode_data
+from names_table import NamesTable
+
+
+def load_source(name, **kwargs):
+    # 旧实现在导入时整体解包的数据，只用于对比
+    with open(unicode_data.SOURCE_PATHS[name], 'rb') as f:
+        return msgpack.unpackb(zlib.decompress(f.read()), strict_map_key=False, **kwargs)
+
+
+with open(unicode_data.SOURCE_PATHS['NamesList'], 'rb') as f:
+    NAMES_LIST = NamesTable.unpack(zlib.decompress(f.read())).to_entries()
+VERSIONS = load_source('Versions', use_list=False)
+COMMON_NAMES = load_source('CommonNames', use_list=False)
+
+
+def get_char_name_linear(code):
+    if code in uf.NOT_CHAR:
+        return f'<not a character-{code:04X}>'
+    if 0xD800 <= code <= 0xDFFF:
+        return f'SURROGATE-{code:04X}'
+    name = NAMES_LIST.get(code, {'name': None})['name']
+    if name:
+        return name
+    for (s, e), v in COMMON_NAMES.items():
+        if s <= code <= e:
+            return v.replace('#', f'{code:04X}')
+    return f'<undefined character-{code:04X}>'
+
+
+def get_char_version_linear(code):
+    version = VERSIONS['single'].get(code)
+    if version is not None:
+        return version
+    for (s, e), v in VERSIONS['range'].items():
+        if s <= code <= e:
+            return v
+    return 'unassigned'
+
+
+def get_group_quadratic(groups, group_lens, code_index):
+    for i in range(0, len(group_lens)):
+        if sum(group_lens[:i + 1]) >= code_index + 1:
+            return groups[i], code_index - sum(group_lens[:i])
+
+
+def timeit(func, codes):
+    start = time.perf_counter()
+    res = [func(code) for code in codes]
+    return time.perf_counter() - start, res
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='字符信息查找的基准测试')
+    parser.add_argument('--skip_linear', action='store_true',
+                        help='不测量旧的线性查找实现。')
+    args = parser.parse_args()
+
+    codes = range(0x110000)
+    pairs = [
+        ('get_char_name', uf.get_char_name, get_char_name_linear),
+        ('get_char_version', uf.get_char_version, get_char_version_linear),
+    ]
+    for name, func, linear in pairs:
+        elapsed, res = timeit(func, codes)
+        print(f'{name:>24}: {elapsed:7.3f} 秒，{elapsed / len(codes) * 1e9:7.1f} 纳秒/码位')
+        if not args.skip_linear:
+            linear_elapsed, linear_res = timeit(linear, codes)
+            assert res == linear_res, f'{name} 的结果与线性实现不一致'
+            print(f'{name + "_linear":>24}: {linear_elapsed:7.3f} 秒，{linear_elapsed / len(codes) * 1e9:7.1f} 纳秒/码位')
+
+    groups, group_lens = uf.get_groups(codes)
+    group_ends = uf.get_group_ends(group_lens)
+    elapsed, res = timeit(lambda i: uf.get_group(groups, group_ends, i), codes)
+    print(f'{"get_group":>24}: {elapsed:7.3f} 秒，{elapsed / len(codes) * 1e9:7.1f} 纳秒/帧（{len(groups)} 个分组）')
+    if not args.skip_linear:
+        sample = codes[::1024]
+        linear_elapsed, linear_res = timeit(lambda i: get_group_quadratic(groups, group_lens, i), sample)
+        assert res[::1024] == linear_res, 'get_group 的结果与旧实现不一致'
+        print(f'{"get_group_quadratic":>24}: {linear_elapsed / len(sample) * 1e9:7.1f} 纳秒/帧（抽样 {len(sample)} 帧）')
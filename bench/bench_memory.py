@@ -0,0 +1,68 @@
+"""
+对比码位集合在两种表示下的内存占用（tracemalloc 统计）与成员判断耗时：
+  set：旧实现在导入时构建的 Python set（DEFINED_CHARACTER_LIST、UNDEFINED_CHARACTER_LIST、CTRLS、NOT_CHAR）；
+  bitmap：当前的 CodeBitmap，每个码位一位。
+defined 的位图包含私用区（旧实现另行判断私用区），因此两者的码位数不同。
+"""
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import msgpack
+import zlib
+
+import uni_flash as uf
+import control_map as cm
+import unicode_data
+from unicode_data import CodeBitmap, CODESPACE_SIZE
+
+
+def measure(build):
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    result = build()
+    size = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    return result, size
+
+
+def build_sets():
+    with open(unicode_data.SOURCE_PATHS['DefinedCharacterList'], 'rb') as f:
+        defined_list = set(msgpack.unpackb(zlib.decompress(f.read())))
+    ctrls = {code for code in range(CODESPACE_SIZE) if code in cm.CTRLS}
+    not_char = {code for code in range(CODESPACE_SIZE) if code in cm.NOT_CHAR_BITMAP}
+    undefined = set(range(CODESPACE_SIZE)) - defined_list - ctrls
+    return {'defined': defined_list - ctrls, 'undefined': undefined, 'control': ctrls, 'not_char': not_char}
+
+
+def build_bitmaps():
+    defined_list = CodeBitmap(unicode_data.get_defined_list().bits.copy())
+    ctrls = CodeBitmap.from_bools(cm.CTRLS.to_bools())
+    not_char = CodeBitmap.from_bools(cm.NOT_CHAR_BITMAP.to_bools())
+    return {
+        'defined': defined_list - ctrls | uf.PRIVATE_USE, 'undefined': ~(defined_list | ctrls),
+        'control': ctrls, 'not_char': not_char
+    }
+
+
+def time_lookup(container):
+    start = time.perf_counter()
+    for code in range(CODESPACE_SIZE):
+        code in container
+    return (time.perf_counter() - start) / CODESPACE_SIZE * 1e9
+
+
+if __name__ == '__main__':
+    # 先打开一次编译数据，避免把它的加载算进位图的内存
+    unicode_data.get_data()
+    sets, set_size = measure(build_sets)
+    bitmaps, bitmap_size = measure(build_bitmaps)
+
+    for name in sets:
+        print(f'{name:>10}: {len(sets[name]):7} / {len(bitmaps[name]):7} 个码位，'
+              f'set {time_lookup(sets[name]):6.1f} 纳秒/次，bitmap {time_lookup(bitmaps[name]):6.1f} 纳秒/次')
+    print(f'   set 总计: {set_size / 2 ** 20:8.2f} MiB')
+    print(f'bitmap 总计: {bitmap_size / 2 ** 20:8.2f} MiB')
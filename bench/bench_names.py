@@ -0,0 +1,107 @@
+"""
+NamesList 各种存储方式的内存占用与查找耗时：
+  dict：整体解包成以 str(码位) 为键、每个码位一个 9 字段 dict 的旧格式，查找时先格式化 str(code)；
+  columnar：整体解压 ToolFiles/NamesList.mp.zlib 得到的列式表（names_table.NamesTable），以整数二分查找；
+  compiled：unicode_data 中 mmap 的编译结果，与 columnar 的查找方式相同，数据页由各进程共享。
+内存为 tracemalloc 统计的加载后常驻的 Python 堆（不含 mmap 的文件），另外列出编译结果的文件大小。
+查找耗时分别测量只取名称（get_char_name 的用法）与取整个条目（信息栏的用法），并校验各实现的结果一致。
+"""
+import os
+import sys
+import time
+import zlib
+import random
+import argparse
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import msgpack
+
+import unicode_data
+from names_table import NamesTable, LIST_FIELDS
+
+
+def read_source():
+    with open(unicode_data.SOURCE_PATHS['NamesList'], 'rb') as f:
+        return zlib.decompress(f.read())
+
+
+def traced(load):
+    """返回 (load() 的结果, 加载后常驻的内存字节数, 加载过程中的峰值字节数, 耗时)。"""
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = load()
+    elapsed = time.perf_counter() - start
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, current, peak, elapsed
+
+
+def load_dict(packed):
+    return msgpack.unpackb(packed)
+
+
+def dict_get_name(names_list, code):
+    entry = names_list.get(str(code))
+    return entry['name'] if entry is not None else None
+
+
+def dict_get_entry(names_list, code):
+    entry = names_list.get(str(code))
+    if entry is None:
+        return None
+    return {k: v for k, v in entry.items() if k != 'code' and (v or k == 'name')}
+
+
+def timeit(func, codes):
+    start = time.perf_counter()
+    res = [func(code) for code in codes]
+    return (time.perf_counter() - start) / len(codes), res
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='NamesList 存储方式的内存占用与查找耗时')
+    parser.add_argument('-n', '--samples', type=int, default=200000,
+                        help='在整个码位空间中随机抽取的码位数，默认 200000。')
+    args = parser.parse_args()
+
+    source = read_source()
+    # 由列式数据还原出旧格式（str 键）的 msgpack，只用于对比
+    legacy = msgpack.packb({str(code): entry for code, entry in NamesTable.unpack(source).to_entries().items()})
+
+    dict_names, dict_mem, dict_peak, dict_load = traced(lambda: load_dict(legacy))
+    table, table_mem, table_peak, table_load = traced(lambda: NamesTable.unpack(source))
+    compiled, compiled_mem, compiled_peak, compiled_load = traced(lambda: unicode_data.get_data().names)
+    compiled_size = os.path.getsize(os.path.join(unicode_data.COMPILED_FOLDER, 'names_table.bin'))
+
+    print(f'{len(table)} 个条目，列表字段：{", ".join(LIST_FIELDS)}')
+    print(f'{"存储方式":<10}{"常驻内存(MiB)":>14}{"加载峰值(MiB)":>14}{"加载(ms)":>10}')
+    for name, mem, peak, load in (
+        ('dict', dict_mem, dict_peak, dict_load),
+        ('columnar', table_mem, table_peak, table_load),
+        ('compiled', compiled_mem, compiled_peak, compiled_load)
+    ):
+        print(f'{name:<14}{mem / 2 ** 20:>14.2f}{peak / 2 ** 20:>16.2f}{load * 1000:>12.1f}')
+    print(f'compiled 的 names_table.bin：{compiled_size / 2 ** 20:.2f} MiB（mmap，各进程共享）')
+
+    random.seed(0)
+    samples = {
+        '有条目的码位': list(table.codes),
+        '随机码位': [random.randrange(unicode_data.CODESPACE_SIZE) for _ in range(args.samples)]
+    }
+    for sample_name, codes in samples.items():
+        print(f'\n{sample_name}（{len(codes)} 个），每次查找的耗时（纳秒）：')
+        print(f'{"存储方式":<10}{"名称":>10}{"条目":>10}')
+        reference = None
+        for name, get_name, get_entry in (
+            ('dict', lambda c: dict_get_name(dict_names, c), lambda c: dict_get_entry(dict_names, c)),
+            ('columnar', table.get_name, table.get_entry),
+            ('compiled', compiled.get_name, compiled.get_entry)
+        ):
+            name_time, names = timeit(get_name, codes)
+            entry_time, entries = timeit(get_entry, codes)
+            if reference is None:
+                reference = names, entries
+            assert (names, entries) == reference, f'{name} 的结果与 dict 不一致'
+            print(f'{name:<14}{name_time * 1e9:>10.0f}{entry_time * 1e9:>12.0f}')
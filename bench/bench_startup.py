@@ -0,0 +1,54 @@
+"""
+测量导入 uni_flash 的耗时（在新的子进程中执行，取中位数），以及：
+  compile：把 ToolFiles/*.mp.zlib 编译成 mmap 格式的耗时（只在数据更新后发生一次）；
+  first lookup：导入后第一次查询字符信息（会打开编译数据）的耗时；
+  deps：只导入第三方依赖（PIL、numpy、cv2 等）的耗时，作为下限参考。
+"""
+import os
+import sys
+import time
+import argparse
+import statistics
+import subprocess
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import unicode_data
+
+DEPS = 'import PIL.Image, PIL.ImageDraw, PIL.ImageFont, tqdm, fontTools.ttLib, cv2, numpy, msgpack'
+FIRST_LOOKUP = (
+    'import time; import uni_flash; t = time.perf_counter(); '
+    'uni_flash.get_char_name(0x4E00); uni_flash.get_char_version(0x4E00); '
+    'print(time.perf_counter() - t)'
+)
+
+
+def run(code, repeat):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, '-c', code], cwd=ROOT, check=True, stdout=subprocess.DEVNULL)
+        times.append(time.perf_counter() - start)
+    return statistics.median(times)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='导入耗时的基准测试')
+    parser.add_argument('-n', '--repeat', type=int, default=5,
+                        help='每项重复的次数，默认 5。')
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    unicode_data.compile_data()
+    print(f'       compile: {(time.perf_counter() - start) * 1000:8.1f} 毫秒')
+
+    deps = run(DEPS, args.repeat)
+    full = run('import uni_flash', args.repeat)
+    print(f'          deps: {deps * 1000:8.1f} 毫秒')
+    print(f'import uni_flash: {full * 1000:6.1f} 毫秒（除依赖外 {(full - deps) * 1000:.1f} 毫秒）')
+
+    out = subprocess.run(
+        [sys.executable, '-c', FIRST_LOOKUP], cwd=ROOT, check=True, capture_output=True, text=True
+    ).stdout
+    print(f'  first lookup: {float(out) * 1000:8.1f} 毫秒')
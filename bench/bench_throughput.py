@@ -0,0 +1,226 @@
+"""
+代表性工作负载下的出帧速度（帧/秒）、峰值内存（RSS）与启动耗时：
+  image：在单个进程中直接循环调用 generate_an_image，不经过进程池和编码器；
+  pipeline：与 generate_unicode_flash 相同的完整流程（进程池渲染 + opencv 编码写入临时文件）。
+每次测量都在新的子进程中进行并重复多次，取中位数；启动耗时为导入 uni_flash 的时间，
+首帧耗时为从导入完成到得到第一帧的时间（包括加载字体、建立进程池）。
+工作负载（每个取前 -n 帧）：
+  latin     基本拉丁字母 U+0020~U+007E；
+  cjk       中日韩统一表意文字 U+4E00 起（名称由公共名称区间得出的路径）；
+  pua       第 15、16 平面的私用区；
+  use_last  U+0E00 起的泰文、老挝文、藏文，使用 LastResort（-ul）；
+  from_font 自定义字体（默认为 Sarasa-Mono-SC-Regular.ttf）中的字符（-ff）。
+用 -o 保存结果（附带提交、Python 版本与 CPU 核数），用 -c 与之前保存的结果对比，便于逐个提交比较性能。
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import platform
+import statistics
+import subprocess
+import tempfile
+
+try:
+    import resource
+except ImportError:
+    # Windows 上没有 resource 模块，不报告峰值内存
+    resource = None
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+DEFAULT_FONT = os.path.join(ROOT, 'Sarasa-Mono-SC-Regular.ttf')
+MODES = ('image', 'pipeline')
+WORKLOADS = {
+    'latin': {'ranges': [(0x20, 0x7F)]},
+    'cjk': {'ranges': [(0x4E00, 0xA000)]},
+    'pua': {'ranges': [(0xF0000, 0xF0100), (0x100000, 0x100100)]},
+    'use_last': {'ranges': [(0x0E00, 0x1000)], 'last_type': 1},
+    'from_font': {'from_font': True}
+}
+DIMENSIONS = {
+    'bar_height': 36,
+    'margin_top': 15,
+    'margin_bottom': 15,
+    'margin_left': 30,
+    'margin_right': 30,
+}
+VIDEO_PROPERTIES = {'width': 1920, 'height': 1080, 'fps': 15}
+
+
+def peak_rss_mib():
+    """返回 (本进程, 已结束的子进程中最大) 的峰值 RSS（MiB）。"""
+    if resource is None:
+        return None, None
+    # Linux 上 ru_maxrss 的单位是 KiB，macOS 上是字节
+    unit = 1 if sys.platform == 'darwin' else 1024
+    return tuple(
+        resource.getrusage(who).ru_maxrss * unit / 2 ** 20
+        for who in (resource.RUSAGE_SELF, resource.RUSAGE_CHILDREN)
+    )
+
+
+def get_workload(name, frames, font):
+    """返回 (codes, 自定义字体路径列表, opts)。"""
+    import uni_flash as uf
+
+    workload = WORKLOADS[name]
+    opts = {
+        'last_type': workload.get('last_type', 0),
+        'show_private': False,
+        'show_undefined': False,
+        'show_control': False,
+        'show_reserved': False,
+        'glyph_cache': None
+    }
+    if workload.get('from_font'):
+        return uf.get_all_codes_from_font(font).tolist()[:frames], [font], opts
+    codes = [code for start, stop in workload['ranges'] for code in range(start, stop)]
+    return codes[:frames], [], opts
+
+
+def run_child(mode, name, frames, font, workers):
+    """在子进程中执行一次测量，结果以 JSON 输出到 stdout。"""
+    start = time.perf_counter()
+    import uni_flash as uf
+    startup = time.perf_counter() - start
+
+    start = time.perf_counter()
+    codes, font_paths, opts = get_workload(name, frames, font)
+    groups, group_lens = uf.get_groups(codes)
+    info_fonts = uf.load_info_fonts()
+    custom_fonts = uf.load_custom_fonts(font_paths)
+    img_props = {'width': VIDEO_PROPERTIES['width'], 'height': VIDEO_PROPERTIES['height']}
+    first_frame = None
+
+    if mode == 'image':
+        uf.load_last_fonts(opts['last_type'])
+        fonts = (
+            *((uf.ImageFont.truetype(path, uf.EXAMPLE_FONT_SIZE), font_name) for path, _, font_name in custom_fonts),
+            *((None, font_name) for font_name in uf.unicode_data.get_font_names())
+        )
+        group_ends = uf.get_group_ends(group_lens)
+        for idx, (code, record) in enumerate(uf.iter_code_infos(codes, uf.build_font_table(custom_fonts, opts))):
+            group = {'groups': groups, 'group_ends': group_ends, 'code_index': idx}
+            uf.generate_an_image(code, uf.unpack_code_info(record), group, DIMENSIONS, img_props, info_fonts, fonts, opts)
+            if first_frame is None:
+                first_frame = time.perf_counter() - start
+    else:
+        with tempfile.TemporaryDirectory() as tmp:
+            writer = uf.open_video_writer(os.path.join(tmp, 'bench.mp4'), VIDEO_PROPERTIES)
+            for _, frame in uf.render_frames(
+                codes, groups, group_lens, DIMENSIONS, img_props, info_fonts, custom_fonts, opts, workers
+            ):
+                writer.write(frame)
+                if first_frame is None:
+                    first_frame = time.perf_counter() - start
+            writer.release()
+
+    elapsed = time.perf_counter() - start
+    rss, children_rss = peak_rss_mib()
+    json.dump({
+        'frames': len(codes),
+        'startup': startup,
+        'first_frame': first_frame,
+        'elapsed': elapsed,
+        'fps': len(codes) / elapsed,
+        'peak_rss': rss,
+        'peak_rss_children': children_rss
+    }, sys.stdout)
+
+
+def measure(mode, name, args):
+    """在新的子进程中重复测量 args.repeat 次，各项取中位数。"""
+    runs = []
+    for _ in range(args.repeat):
+        out = subprocess.run(
+            [sys.executable, __file__, '--child', mode, name,
+             '-n', str(args.frames), '-f', args.font, '-w', str(args.workers)],
+            cwd=ROOT, check=True, capture_output=True, text=True
+        ).stdout
+        runs.append(json.loads(out))
+    result = {
+        key: statistics.median(run[key] for run in runs) if runs[0][key] is not None else None
+        for key in runs[0] if key != 'frames'
+    }
+    result['frames'] = runs[0]['frames']
+    # 各次出帧速度的相对离散程度，用来判断结果是否稳定
+    fps = [run['fps'] for run in runs]
+    result['fps_spread'] = (max(fps) - min(fps)) / result['fps'] if result['fps'] else 0.0
+    return result
+
+
+def get_environment(workers):
+    try:
+        commit = subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT, capture_output=True, text=True
+        ).stdout.strip() or None
+    except OSError:
+        commit = None
+    return {
+        'commit': commit,
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'workers': workers
+    }
+
+
+def format_mib(value):
+    return f'{value:8.1f}' if value is not None else '       -'
+
+
+def print_results(results, baseline=None):
+    print(f'{"测试":<22}{"帧/秒":>7}{"离散":>7}{"启动(ms)":>8}{"首帧(ms)":>8}{"RSS(MiB)":>9}{"子进程":>6}')
+    for key, result in results.items():
+        line = (f'{key:<24}{result["fps"]:>9.1f}{result["fps_spread"] * 100:>8.1f}%'
+                f'{result["startup"] * 1000:>10.1f}{result["first_frame"] * 1000:>10.1f}'
+                f'{format_mib(result["peak_rss"])}{format_mib(result["peak_rss_children"])}')
+        old = (baseline or {}).get(key)
+        if old:
+            line += f'   帧/秒 {(result["fps"] / old["fps"] - 1) * 100:+.1f}%'
+        print(line)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='代表性工作负载的出帧速度、峰值内存与启动耗时基准测试')
+    parser.add_argument('-m', '--modes', choices=MODES, nargs='*', default=list(MODES),
+                        help='测量的模式，默认全部。')
+    parser.add_argument('-l', '--workloads', choices=WORKLOADS, nargs='*', default=list(WORKLOADS),
+                        help='测量的工作负载，默认全部。')
+    parser.add_argument('-n', '--frames', type=int, default=256,
+                        help='每个工作负载的帧数，默认 256。')
+    parser.add_argument('-r', '--repeat', type=int, default=3,
+                        help='每项重复的次数（各在新的子进程中），默认 3。')
+    parser.add_argument('-w', '--workers', type=int, default=os.cpu_count() or 4,
+                        help='pipeline 模式的工作进程数，默认为 CPU 核数。')
+    parser.add_argument('-f', '--font', type=str, default=DEFAULT_FONT,
+                        help='from_font 工作负载使用的字体，默认为 Sarasa-Mono-SC-Regular.ttf。')
+    parser.add_argument('-o', '--output', type=str,
+                        help='把结果与测试环境保存为 JSON 文件。')
+    parser.add_argument('-c', '--compare', type=str,
+                        help='与之前用 -o 保存的结果对比出帧速度。')
+    parser.add_argument('--child', nargs=2, metavar=('MODE', 'WORKLOAD'), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        run_child(*args.child, args.frames, args.font, args.workers)
+        sys.exit()
+
+    baseline = None
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            baseline = json.load(f)['results']
+
+    results = {}
+    for mode in args.modes:
+        for name in args.workloads:
+            results[f'{mode}/{name}'] = measure(mode, name, args)
+    print_results(results, baseline)
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump({'environment': get_environment(args.workers), 'frames': args.frames, 'results': results},
+                      f, ensure_ascii=False, indent=2)
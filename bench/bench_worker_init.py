@@ -0,0 +1,105 @@
+"""
+对比两种进程池任务形式的出帧速度（帧/秒）：
+  per-task：每个任务携带完整上下文（旧实现），字体与选项随每个任务 pickle 一次；
+  initializer：上下文由 _init_worker 在每个工作进程中加载一次，任务只含 (code_index, code, slot, info)，
+               帧经共享内存帧环返回（即 render_frames）。
+只渲染、不编码，帧在主进程中直接丢弃。
+"""
+import os
+import sys
+import time
+import pickle
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import cv2
+import numpy as np
+from PIL import ImageFont
+
+import uni_flash as uf
+
+DIMENSIONS = {
+    'bar_height': 36,
+    'margin_top': 15,
+    'margin_bottom': 15,
+    'margin_left': 30,
+    'margin_right': 30,
+}
+IMG_PROPS = {'width': 1920, 'height': 1080}
+OPTS = {
+    'last_type': 0,
+    'show_private': False,
+    'show_undefined': False,
+    'show_control': False,
+    'show_reserved': False
+}
+
+
+def _legacy_worker(args):
+    # 旧实现的任务形式：所有上下文都在任务里
+    code_index, code, info, groups, group_ends, dimensions, img_props, info_fonts, fonts, opts = args
+    pil_img = uf.generate_an_image(
+        code,
+        info,
+        {'groups': groups, 'group_ends': group_ends, 'code_index': code_index},
+        dimensions,
+        img_props,
+        info_fonts,
+        fonts,
+        opts
+    )
+    return code_index, cv2.cvtColor(np.array(pil_img), cv2.COLOR_GRAY2BGR)
+
+
+def bench_per_task(codes, workers, info_fonts, custom_fonts):
+    groups, group_lens = uf.get_groups(codes)
+    legacy_fonts = (
+        *((ImageFont.truetype(path, uf.EXAMPLE_FONT_SIZE), name) for path, _, name in custom_fonts),
+        *((None, name) for name in uf.unicode_data.get_font_names())
+    )
+    font_table = uf.build_font_table(custom_fonts, OPTS)
+    group_ends = uf.get_group_ends(group_lens)
+    tasks = [
+        (idx, code, uf.unpack_code_info(record), groups, group_ends, DIMENSIONS, IMG_PROPS, info_fonts, legacy_fonts, OPTS)
+        for idx, (code, record) in enumerate(uf.iter_code_infos(codes, font_table))
+    ]
+    task_size = len(pickle.dumps(tasks[0]))
+    start = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=workers) as exe:
+        for _ in exe.map(_legacy_worker, tasks, chunksize=8):
+            pass
+    return len(codes) / (time.perf_counter() - start), task_size
+
+
+def bench_initializer(codes, workers, info_fonts, custom_fonts):
+    groups, group_lens = uf.get_groups(codes)
+    code, record = next(uf.iter_code_infos(codes[:1], uf.build_font_table(custom_fonts, OPTS)))
+    task_size = len(pickle.dumps((0, code, 0, record)))
+    start = time.perf_counter()
+    for _ in uf.render_frames(
+        codes, groups, group_lens, DIMENSIONS, IMG_PROPS, info_fonts, custom_fonts, OPTS, workers
+    ):
+        pass
+    return len(codes) / (time.perf_counter() - start), task_size
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='进程池任务形式的出帧速度基准测试')
+    parser.add_argument('-r', '--rang', type=lambda v: int(v, 16), nargs=2,
+                        default=[0x4E00, 0x4FFF],
+                        help='测试的码位范围，不带0x的十六进制数，默认 4E00 4FFF。')
+    parser.add_argument('-w', '--workers', type=int, default=os.cpu_count() or 4,
+                        help='工作进程数，默认为 CPU 核数。')
+    parser.add_argument('-f', '--fonts', type=str, nargs='*', default=[],
+                        help='自定义字体路径列表。')
+    args = parser.parse_args()
+
+    codes = list(range(args.rang[0], args.rang[1] + 1))
+    info_fonts = uf.load_info_fonts()
+    custom_fonts = uf.load_custom_fonts(args.fonts)
+
+    for name, func in (('per-task', bench_per_task), ('initializer', bench_initializer)):
+        fps, task_size = func(codes, args.workers, info_fonts, custom_fonts)
+        print(f'{name:>12}: {fps:8.1f} 帧/秒，单个任务 pickle 后 {task_size} 字节')
@@ -0,0 +1,102 @@
+import numpy as np
+
+import bisect
+import itertools
+import operator
+
+
+class CodeRanges:
+    """
+    由若干不相交的半开区间 [start, stop) 组成的码位集合，支持并（|）、交（&）、差（-）。
+    集合运算只涉及区间的端点，与区间内的码位数无关；迭代时才按升序逐个产出码位。
+    内部以升序的端点列表 bounds = [start0, stop0, start1, stop1, ...] 表示，
+    因此码位 c 属于集合当且仅当 bisect_right(bounds, c) 为奇数。
+    """
+
+    def __init__(self, bounds=()):
+        self.bounds = list(bounds)
+
+    @classmethod
+    def from_range(cls, start, stop):
+        return cls((start, stop) if start < stop else ())
+
+    @classmethod
+    def from_bools(cls, flags):
+        """flags[c] 为真的码位 c 组成的集合。"""
+        padded = np.concatenate(([False], np.asarray(flags, dtype=bool), [False]))
+        return cls(np.flatnonzero(padded[1:] != padded[:-1]).tolist())
+
+    @classmethod
+    def from_codes(cls, codes):
+        codes = np.unique(np.fromiter(codes, dtype=np.int64))
+        if not len(codes):
+            return cls()
+        # 相邻码位不连续处即为区间的断点
+        breaks = np.flatnonzero(np.diff(codes) != 1)
+        starts = codes[np.concatenate(([0], breaks + 1))]
+        stops = codes[np.concatenate((breaks, [len(codes) - 1]))] + 1
+        return cls(np.column_stack((starts, stops)).ravel().tolist())
+
+    def ranges(self):
+        """依次产出各个区间对应的 range。"""
+        return itertools.starmap(range, zip(self.bounds[::2], self.bounds[1::2]))
+
+    def contains(self, codes):
+        """批量的成员判断：codes 为码位序列，返回布尔数组。"""
+        return np.searchsorted(self.bounds, np.asarray(codes, dtype=np.int64), side='right') % 2 == 1
+
+    def filter(self, codes):
+        """保持顺序与重复，返回 codes 中属于集合的码位组成的列表。"""
+        return [code for code, keep in zip(codes, self.contains(codes).tolist()) if keep]
+
+    def _combine(self, other, op):
+        # 在两个集合的所有端点处切分，逐段按 op 决定是否属于结果
+        bounds = []
+        points = sorted(set(self.bounds) | set(other.bounds))
+        for start, stop in zip(points, points[1:]):
+            if op(start in self, start in other):
+                if bounds and bounds[-1] == start:
+                    bounds[-1] = stop
+                else:
+                    bounds += [start, stop]
+        return CodeRanges(bounds)
+
+    def __or__(self, other):
+        return self._combine(other, operator.or_)
+
+    def __and__(self, other):
+        return self._combine(other, operator.and_)
+
+    def __sub__(self, other):
+        return self._combine(other, lambda a, b: a and not b)
+
+    def __contains__(self, code):
+        return bisect.bisect_right(self.bounds, code) % 2 == 1
+
+    def __getitem__(self, index):
+        """只支持步长为 1 的切片：按升序取第 start 到 stop - 1 个码位，返回 CodeRanges。"""
+        if not isinstance(index, slice) or index.step not in (None, 1):
+            raise TypeError('CodeRanges 只支持步长为 1 的切片')
+        start, stop, _ = index.indices(len(self))
+        bounds = []
+        offset = 0
+        for r in self.ranges():
+            lo, hi = max(start - offset, 0), min(stop - offset, len(r))
+            if lo < hi:
+                bounds += [r.start + lo, r.start + hi]
+            offset += len(r)
+        return CodeRanges(bounds)
+
+    def __iter__(self):
+        return itertools.chain.from_iterable(self.ranges())
+
+    def __len__(self):
+        return sum(stop - start for start, stop in zip(self.bounds[::2], self.bounds[1::2]))
+
+    def __eq__(self, other):
+        return isinstance(other, CodeRanges) and self.bounds == other.bounds
+
+    def __repr__(self):
+        return 'CodeRanges([{}])'.format(', '.join(
+            f'{r.start:04X}..{r.stop - 1:04X}' for r in self.ranges()
+        ))
@@ -1,11 +1,11 @@
-from functools import partial
+from functools import partial, cache
 import os
 import csv
-import zlib
-import msgpack
+import bisect
+
+from unicode_data import CodeBitmap, get_defined_list
 
 CUR_FOLDER = os.path.dirname(__file__)
-DEFINED_CHARACTER_LIST_PATH = os.path.join(CUR_FOLDER, 'ToolFiles', 'DefinedCharacterList.mp.zlib')
 
 CONTINUOUS_RANGES = [
     (0x00, 0x20, 0x2400),
@@ -79,35 +79,49 @@ NOT_CHAR = [
     *[(0x10000 * i + 0xFFFE, 0x10000 * i + 0xFFFF) for i in range(0, 17)],
     (0xFDD0, 0xFDEF)
 ]
-CTRLS = {
-  *sum([list(range(s, e + 1)) for s, e, _ in CONTINUOUS_RANGES], []), # sum(..., []) 用于扁平化列表。
-  *DISCRETE
-}
+NOT_CHAR_BITMAP = CodeBitmap.from_ranges(NOT_CHAR)
+# 非字符在 NOT_CHAR 中的序号，用于对应 Last Resort 字体中的字形
+NOT_CHAR_INDEX = {code: i for i, (s, e) in enumerate(NOT_CHAR) for code in range(s, e + 1)}
+# 控制字符的位图，每个码位一位
+CTRLS = CodeBitmap.from_ranges([
+  *[(s, e) for s, e, _ in CONTINUOUS_RANGES],
+  *[(code, code) for code in DISCRETE]
+])
 with open(
     os.path.join(CUR_FOLDER, 'ToolFiles', 'Blocks.csv'),
     encoding='utf-8'
 ) as blocks_csv:
     reader = list(csv.reader(blocks_csv, delimiter='|'))
     BLOCK_RANGES = [tuple(map(partial(int, base=16), line[0].split('..'))) for line in reader]
+BLOCK_RANGE_STARTS = [start for start, _ in BLOCK_RANGES]
+
+@cache
+def get_undefined_bitmap() -> CodeBitmap:
+    # 既不在 DefinedCharacterList 中、也不是控制字符
+    return ~(get_defined_list() | CTRLS)
+
+def is_undefined(code: int) -> bool:
+    return code in get_undefined_bitmap()
 
-with open(DEFINED_CHARACTER_LIST_PATH, 'rb') as dclf:
-    DEFINED_CHARACTER_LIST = set(msgpack.unpackb(zlib.decompress(dclf.read())))
-UNDEFINED_CHARACTER_LIST = set(range(0, 0x110000)) - DEFINED_CHARACTER_LIST - CTRLS
+def find_block_index(code: int):
+    i = bisect.bisect_right(BLOCK_RANGE_STARTS, code) - 1
+    if i >= 0 and code <= BLOCK_RANGES[i][1]:
+        return i
+    return None
 
 def get_char(code: int) -> str:
     return CHAR_MAP.get(code, chr(code))
 
 def get_char_in_last_resort(code: int) -> int:
-    for i, (start, end) in enumerate(NOT_CHAR):
-        if start <= code <= end:
-            return 0x10B000 + i
+    if code in NOT_CHAR_BITMAP:
+        return 0x10B000 + NOT_CHAR_INDEX[code]
     
     plane_index = code // 0x10000
-    if plane_index < 0xF and not 0xD800 <= code <= 0xDFFF and code in UNDEFINED_CHARACTER_LIST:
+    if plane_index < 0xF and not 0xD800 <= code <= 0xDFFF and is_undefined(code):
         return 0x10A000 + plane_index
 
-    for i, (start, end) in enumerate(BLOCK_RANGES):
-        if start <= code <= end:
-            return 0x100000 + i
+    i = find_block_index(code)
+    if i is not None:
+        return 0x100000 + i
     
     raise ValueError(f"No last resort mapping found for code point: U+{code:04X}.")
@@ -0,0 +1,63 @@
+from fontTools.ttLib import TTFont
+import numpy as np
+import msgpack
+
+import os
+import hashlib
+
+
+def get_font_name(font):
+    return font['name'].getName(6, 3, 1, 1033).string.decode('utf-8').replace('\0', '')
+
+
+def read_font_info(path):
+    """解析字体文件，返回 (码位数组, 字体名)。只读取 cmap 和 name 两张表。"""
+    font = TTFont(path, lazy=True)
+    try:
+        codes = np.array(sorted(font.getBestCmap() or ()), dtype=np.uint32)
+        return codes, get_font_name(font)
+    finally:
+        font.close()
+
+
+class FontInfoCache:
+    """
+    字体 cmap 与字体名的磁盘缓存，避免每次运行都重新解析字体（大型 CJK 字体要花上数秒）。
+    每个字体对应缓存目录下的 <key>.mp，key 由字体的绝对路径得出，
+    内容为 msgpack {'size', 'mtime', 'name', 'codes'}，codes 为 uint32 码位数组的字节；
+    文件大小或修改时间与记录不符时重新解析并覆盖。
+    """
+
+    def __init__(self, cache_dir):
+        self.cache_dir = cache_dir
+        os.makedirs(cache_dir, exist_ok=True)
+        self.infos = {}
+
+    def get(self, path):
+        """返回 (码位数组, 字体名)。"""
+        path = os.path.abspath(path)
+        stat = os.stat(path)
+        stamp = (stat.st_size, stat.st_mtime_ns)
+        cached = self.infos.get(path)
+        if cached is not None and cached[0] == stamp:
+            return cached[1]
+
+        key = hashlib.sha1(path.encode('utf-8')).hexdigest()[:16]
+        cache_path = os.path.join(self.cache_dir, key + '.mp')
+        info = None
+        if os.path.exists(cache_path):
+            with open(cache_path, 'rb') as f:
+                record = msgpack.unpackb(f.read())
+            if (record['size'], record['mtime']) == stamp:
+                info = np.frombuffer(record['codes'], dtype='<u4'), record['name']
+        if info is None:
+            info = read_font_info(path)
+            record = {'size': stamp[0], 'mtime': stamp[1], 'name': info[1], 'codes': info[0].astype('<u4').tobytes()}
+            # 写入临时文件后原子地替换，多个进程同时写入时也不会读到不完整的记录
+            tmp_path = f'{cache_path}.{os.getpid()}.tmp'
+            with open(tmp_path, 'wb') as f:
+                f.write(msgpack.packb(record))
+            os.replace(tmp_path, cache_path)
+
+        self.infos[path] = (stamp, info)
+        return info
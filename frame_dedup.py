@@ -0,0 +1,48 @@
+import numpy as np
+
+# 比较帧时使用的块大小，与编码器的宏块一致
+BLOCK_SIZE = 16
+# 变化的块占比不超过这个值的帧算作“局部更新”
+PARTIAL_THRESHOLD = 0.05
+
+
+class FrameDiffStats:
+    """
+    逐帧与上一帧比较，按 BLOCK_SIZE×BLOCK_SIZE 的块统计变化的区域：
+      identical  与上一帧完全相同，可以只延长上一帧的时长；
+      partial    变化的块不超过 PARTIAL_THRESHOLD，编码器只需编码少量宏块；
+      full       其余的帧（包括第一帧）。
+    """
+
+    def __init__(self):
+        self.previous = None
+        self.counts = {'identical': 0, 'partial': 0, 'full': 0}
+        self.changed_blocks = 0.0
+
+    def add(self, frame):
+        if self.previous is None:
+            self.previous = frame.copy()
+            self.counts['full'] += 1
+            return 'full'
+
+        h, w = frame.shape
+        diff = frame != self.previous
+        # 补齐到块大小的整数倍后按块合并
+        diff = np.pad(diff, ((0, -h % BLOCK_SIZE), (0, -w % BLOCK_SIZE)))
+        blocks = diff.reshape(diff.shape[0] // BLOCK_SIZE, BLOCK_SIZE, diff.shape[1] // BLOCK_SIZE, BLOCK_SIZE)
+        changed = float(blocks.any(axis=(1, 3)).mean())
+        np.copyto(self.previous, frame)
+
+        self.changed_blocks += changed
+        kind = 'identical' if changed == 0 else 'partial' if changed <= PARTIAL_THRESHOLD else 'full'
+        self.counts[kind] += 1
+        return kind
+
+    def report(self):
+        total = sum(self.counts.values())
+        return {
+            'frames': total,
+            **self.counts,
+            # 除第一帧外，平均每帧变化的块占比
+            'mean_changed_blocks': self.changed_blocks / (total - 1) if total > 1 else 0.0
+        }
@@ -0,0 +1,50 @@
+from multiprocessing import shared_memory
+import math
+
+import numpy as np
+
+
+class FrameRing:
+    """
+    基于 multiprocessing.shared_memory 的帧槽环。
+    主进程创建环，工作进程按名字连接后把帧直接渲染进槽中，
+    进程间只传递槽的序号，帧数据不再经过管道。
+    """
+
+    def __init__(self, slot_count, frame_shape, name=None):
+        self.slot_count = slot_count
+        self.frame_shape = tuple(frame_shape)
+        self.owner = name is None
+        size = slot_count * math.prod(self.frame_shape)
+        if self.owner:
+            self.shm = shared_memory.SharedMemory(create=True, size=size)
+        else:
+            # 工作进程与主进程共用同一个 resource_tracker，连接方只 close，不 unlink
+            self.shm = shared_memory.SharedMemory(name=name)
+        self.frames = np.ndarray(
+            (slot_count, *self.frame_shape),
+            dtype=np.uint8,
+            buffer=self.shm.buf
+        )
+
+    @property
+    def spec(self):
+        # 传给工作进程、用于重新连接的参数
+        return self.slot_count, self.frame_shape, self.shm.name
+
+    @classmethod
+    def attach(cls, spec):
+        slot_count, frame_shape, name = spec
+        return cls(slot_count, frame_shape, name)
+
+    def close(self):
+        del self.frames
+        self.shm.close()
+        if self.owner:
+            self.shm.unlink()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
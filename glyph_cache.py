@@ -0,0 +1,144 @@
+from PIL import Image, ImageDraw
+import msgpack
+
+import os
+import glob
+import mmap
+import struct
+import hashlib
+
+# .part 文件中每条记录的头：文本长度、宽、高、左上角的 x、y
+RECORD_HEADER = struct.Struct('<IIIii')
+# -um 会单独显示代理码位（U+D800–U+DFFF），文本在 .part 与 .idx 中按 UTF-8 保存时保留这些孤立的代理
+TEXT_ERRORS = 'surrogatepass'
+
+
+class GlyphCache:
+    """
+    字形位图缓存，键为 (字体路径, 字体修改时间, 字号, 绘制位置, 锚点, 文本)。
+    每个 (字体, 字号, 绘制位置, 锚点) 对应缓存目录下的一组文件：
+      <key>.bin       所有字形的透明度遮罩依次拼接，读取时用 mmap 映射；
+      <key>.idx       msgpack 索引 {文本: (偏移, 宽, 高, x, y)}；
+      <key>.<pid>.part 各进程本次新渲染的字形，由 merge() 合并进 .bin 和 .idx。
+    工作进程只读 .bin/.idx、只写自己的 .part，因此可以并行使用同一个缓存目录。
+    本进程新渲染的字形记在 pending 中（{文本: (在 .part 中的偏移, 宽, 高, x, y)}），再次用到时从 .part 读回，不会重复渲染和写入。
+    """
+
+    def __init__(self, cache_dir):
+        self.cache_dir = cache_dir
+        os.makedirs(cache_dir, exist_ok=True)
+        self.stores = {}
+        self.keys = {}
+
+    @staticmethod
+    def store_key(font, xy, size, anchor='mm'):
+        stat = os.stat(font.path)
+        raw = f'{os.path.abspath(font.path)}|{stat.st_mtime_ns}|{font.size}|{xy}|{size}'
+        if anchor != 'mm':
+            # 字形使用的 'mm' 不计入，已有的缓存仍然有效
+            raw += f'|{anchor}'
+        return hashlib.sha1(raw.encode('utf-8')).hexdigest()[:16]
+
+    def _open_store(self, key):
+        bin_path = os.path.join(self.cache_dir, key + '.bin')
+        idx_path = os.path.join(self.cache_dir, key + '.idx')
+        index, data = {}, None
+        if os.path.exists(idx_path) and os.path.exists(bin_path) and os.path.getsize(bin_path):
+            with open(idx_path, 'rb') as f:
+                index = msgpack.unpackb(f.read(), use_list=False, unicode_errors=TEXT_ERRORS)
+            with open(bin_path, 'rb') as f:
+                data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        # .part 文件在第一次未命中时才创建
+        return [index, data, None, {}]
+
+    def get(self, font, text, xy, size, anchor='mm'):
+        """
+        返回 (mask, (x, y))：文本以 anchor 绘制在 xy 处时的透明度遮罩及其左上角坐标，可以是多行文本。
+        未命中时用 FreeType 渲染一次，并追加到本进程的 .part 文件中。
+        """
+        key = self.keys.get((font, xy, size, anchor))
+        if key is None:
+            key = self.keys[font, xy, size, anchor] = self.store_key(font, xy, size, anchor)
+        if key not in self.stores:
+            self.stores[key] = self._open_store(key)
+        store = self.stores[key]
+        index, data, part, pending = store
+
+        record = index.get(text)
+        if record is not None:
+            offset, w, h, x, y = record
+            mask = Image.frombytes('L', (w, h), data[offset:offset + w * h])
+            return mask, (x, y)
+        record = pending.get(text)
+        if record is not None:
+            offset, w, h, x, y = record
+            part.seek(offset)
+            mask = Image.frombytes('L', (w, h), part.read(w * h))
+            return mask, (x, y)
+
+        # 在空白画布上以白色绘制，所得像素值即为 draw.text 使用的遮罩
+        canvas = Image.new('L', size, 0)
+        ImageDraw.Draw(canvas).text(xy, text, font=font, fill=255, anchor=anchor)
+        bbox = canvas.getbbox() or (0, 0, 0, 0)
+        mask = canvas.crop(bbox)
+        encoded = text.encode('utf-8', TEXT_ERRORS)
+        if part is None:
+            # 以追加方式打开，读回记录时的 seek 不影响写入的位置
+            part = store[2] = open(os.path.join(self.cache_dir, f'{key}.{os.getpid()}.part'), 'a+b')
+        part.seek(0, os.SEEK_END)
+        part.write(RECORD_HEADER.pack(len(encoded), *mask.size, *bbox[:2]))
+        part.write(encoded)
+        pending[text] = (part.tell(), *mask.size, *bbox[:2])
+        part.write(mask.tobytes())
+        part.flush()
+        return mask, bbox[:2]
+
+    def close(self):
+        for _, data, part, _ in self.stores.values():
+            if data is not None:
+                data.close()
+            if part is not None:
+                part.close()
+        self.stores = {}
+        self.keys = {}
+
+    def merge(self):
+        """把所有 .part 文件合并进对应的 .bin 和 .idx，应在所有工作进程结束后调用。"""
+        self.close()
+        parts = {}
+        for path in glob.glob(os.path.join(self.cache_dir, '*.part')):
+            parts.setdefault(os.path.basename(path).split('.')[0], []).append(path)
+
+        for key, part_paths in parts.items():
+            bin_path = os.path.join(self.cache_dir, key + '.bin')
+            idx_path = os.path.join(self.cache_dir, key + '.idx')
+            index = {}
+            if os.path.exists(idx_path):
+                with open(idx_path, 'rb') as f:
+                    index = msgpack.unpackb(f.read(), use_list=False, unicode_errors=TEXT_ERRORS)
+
+            with open(bin_path, 'ab') as out:
+                for part_path in part_paths:
+                    with open(part_path, 'rb') as f:
+                        content = f.read()
+                    pos = 0
+                    while pos + RECORD_HEADER.size <= len(content):
+                        text_len, w, h, x, y = RECORD_HEADER.unpack_from(content, pos)
+                        pos += RECORD_HEADER.size
+                        if pos + text_len + w * h > len(content):
+                            # 进程中断时写了一半的记录
+                            break
+                        text = content[pos:pos + text_len].decode('utf-8', TEXT_ERRORS)
+                        pos += text_len
+                        mask_bytes = content[pos:pos + w * h]
+                        pos += w * h
+                        if text not in index:
+                            index[text] = (out.tell(), w, h, x, y)
+                            out.write(mask_bytes)
+
+            # 先写完 .bin 再原子地替换 .idx，中断时索引不会指向不完整的数据
+            with open(idx_path + '.tmp', 'wb') as f:
+                f.write(msgpack.packb(index, unicode_errors=TEXT_ERRORS))
+            os.replace(idx_path + '.tmp', idx_path)
+            for part_path in part_paths:
+                os.remove(part_path)
@@ -0,0 +1,97 @@
+"""
+左上角信息栏（兼容性映射、拆解、变体、交叉参考、说明、别名等）的文本。
+
+信息栏的内容只由码位的 NamesList 条目决定，折行只取决于字体和可用宽度，因此可以离线预先折好：
+MakeFileTools/build_info_panels.py 对每种 (字体, 字号, 折行宽度) 生成 ToolFiles/compiled/panels/ 下的
+  <key>.codes.npy    有信息栏文本的码位，升序 uint32；
+  <key>.offsets.npy  各码位文本在 <key>.bin 中的起止偏移，uint32；
+  <key>.bin          逐条拼接的 UTF-8 文本（已折行，不含版本行）。
+运行时若有与当前布局对应、且不比 NamesList 旧的文件，直接查表，否则在运行时折行。
+"""
+import numpy as np
+
+import os
+import mmap
+import bisect
+import hashlib
+
+import unicode_data
+
+PANELS_FOLDER = os.path.join(unicode_data.COMPILED_FOLDER, 'panels')
+# 信息栏各行：(NamesList 字段, 标签, 连接符)，按显示的先后顺序
+PANEL_FIELDS = (
+    ('compat mapping', '兼容性映射：', ', '),
+    ('decomposition', '拆解：', ' '),
+    ('variation', '变体：', ', '),
+    ('cross references', '交叉参考：', ', '),
+    ('comment', '说明：', '; '),
+    ('formal alias', '正式别名：', ', '),
+    ('alias', '别名：', ', ')
+)
+
+
+def get_panel_lines(entry):
+    """由 NamesList 条目得出信息栏各行（未折行），空的字段不占行。"""
+    lines = []
+    for field, label, separator in PANEL_FIELDS:
+        values = entry.get(field, [])
+        if field == 'decomposition':
+            values = ['U+' + c for c in values]
+        text = separator.join(values)
+        if text:
+            lines.append(label + text)
+    return lines
+
+
+def panel_store_key(font, width):
+    """(字体文件, 修改时间, 字号, 折行宽度) 对应的文件名。"""
+    stat = os.stat(font.path)
+    raw = f'{os.path.abspath(font.path)}|{stat.st_mtime_ns}|{font.size}|{width}'
+    return hashlib.sha1(raw.encode('utf-8')).hexdigest()[:16]
+
+
+def write_panel_store(font, width, texts):
+    """texts 为 {码位: 折好的信息栏文本}，写入 PANELS_FOLDER。"""
+    os.makedirs(PANELS_FOLDER, exist_ok=True)
+    prefix = os.path.join(PANELS_FOLDER, panel_store_key(font, width))
+    codes = sorted(texts)
+    encoded = [texts[code].encode('utf-8') for code in codes]
+    offsets = np.zeros(len(codes) + 1, dtype=np.uint32)
+    np.cumsum([len(e) for e in encoded], out=offsets[1:])
+    with open(prefix + '.bin', 'wb') as f:
+        f.write(b''.join(encoded))
+    np.save(prefix + '.offsets.npy', offsets)
+    # codes 最后写入，兼作完成的标记
+    np.save(prefix + '.codes.npy', np.array(codes, dtype=np.uint32))
+
+
+class PanelStore:
+    """读取 write_panel_store 写入的一组文件；get 对没有信息栏文本的码位返回空字符串。"""
+
+    def __init__(self, prefix):
+        def load(name):
+            array = np.load(prefix + name, mmap_mode='r')
+            return memoryview(array).cast('B').cast(array.dtype.char)
+
+        self.codes = load('.codes.npy')
+        self.offsets = load('.offsets.npy')
+        with open(prefix + '.bin', 'rb') as f:
+            size = os.fstat(f.fileno()).st_size
+            self.texts = memoryview(mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)) if size else b''
+
+    @classmethod
+    def open(cls, font, width):
+        """打开 (font, width) 对应的文件；不存在或比 NamesList 旧时返回 None。"""
+        prefix = os.path.join(PANELS_FOLDER, panel_store_key(font, width))
+        codes_path = prefix + '.codes.npy'
+        if not os.path.exists(codes_path):
+            return None
+        if os.path.getmtime(codes_path) < os.path.getmtime(unicode_data.SOURCE_PATHS['NamesList']):
+            return None
+        return cls(prefix)
+
+    def get(self, code):
+        i = bisect.bisect_left(self.codes, code)
+        if i == len(self.codes) or self.codes[i] != code:
+            return ''
+        return bytes(self.texts[self.offsets[i]:self.offsets[i + 1]]).decode('utf-8')
@@ -0,0 +1,159 @@
+"""
+NamesList 的列式存储。
+
+所有字段共用一个升序的码位数组 codes（uint32），每个字段一列：
+  name      每个码位一个字符串；
+  其余字段  每个码位一个字符串列表（可以为空）。
+字符串表由 offsets（uint32，长度为字符串数加一）与逐个拼接的 UTF-8 字节 data 组成；
+列表字段另有 index（uint32，长度为码位数加一），第 i 个码位的字符串为表中的第 index[i] ~ index[i + 1] - 1 个。
+查找时先得到码位的行号，再按偏移切出用到的字符串，不为每个码位建立 dict。
+行号默认在 codes 中二分查找；可另外提供覆盖整个码位空间的 rows（uint32，没有条目的为 NO_ROW），直接按码位取得行号。
+"""
+import numpy as np
+import msgpack
+
+import bisect
+
+NAMES_FIELDS = (
+    'name', 'comment', 'alias', 'formal alias', 'cross references',
+    'variation', 'decomposition', 'compat mapping'
+)
+LIST_FIELDS = NAMES_FIELDS[1:]
+NO_ROW = 0xFFFFFFFF
+
+
+def _as_view(array):
+    # 以 memoryview 访问数组：按单个元素查找时比 numpy 的标量索引快得多
+    array = np.ascontiguousarray(array, dtype=np.uint32)
+    return memoryview(array).cast('B').cast('I')
+
+
+def _string_table(strings):
+    encoded = [s.encode('utf-8') for s in strings]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.uint32)
+    np.cumsum([len(e) for e in encoded], out=offsets[1:])
+    return offsets, b''.join(encoded)
+
+
+class NamesTable:
+    """
+    arrays 为 {数组名: uint32 数组或字节}，数组名见 from_entries：
+      'codes'，'<字段>.offsets'、'<字段>.data'，以及列表字段的 '<字段>.index'。
+    '<字段>.data' 可以是 bytes 或 mmap（切片得到 bytes 的对象），其余数组可以是 mmap 上的视图，NamesTable 本身不复制数据。
+    rows 见模块说明，可以省略。
+    """
+
+    def __init__(self, arrays, rows=None):
+        self.arrays = arrays
+        self.codes = _as_view(arrays['codes'])
+        self.rows = _as_view(rows) if rows is not None else None
+        self.columns = {
+            field: (
+                _as_view(arrays[field + '.index']) if field in LIST_FIELDS else None,
+                _as_view(arrays[field + '.offsets']),
+                arrays[field + '.data']
+            )
+            for field in NAMES_FIELDS
+        }
+        self._name_column = self.columns['name'][1:]
+        self._list_columns = [(field, *self.columns[field]) for field in LIST_FIELDS]
+
+    @classmethod
+    def from_entries(cls, entries):
+        """
+        entries 为 {码位: NamesList 条目 dict}，或逐条产出 (码位, 条目 dict) 的可迭代对象（码位可以无序，重复时以最后一条为准）。
+        条目中缺少的字段视为空。各字段的值逐条收进列中，不另外保存每个条目。
+        """
+        if isinstance(entries, dict):
+            entries = entries.items()
+        positions = {}
+        columns = {field: [] for field in NAMES_FIELDS}
+        for code, entry in entries:
+            positions[code] = len(columns['name'])
+            for field in NAMES_FIELDS:
+                columns[field].append(entry.get(field) or ([] if field in LIST_FIELDS else ''))
+
+        codes = sorted(positions)
+        order = [positions[code] for code in codes]
+        arrays = {'codes': np.array(codes, dtype=np.uint32)}
+        for field in NAMES_FIELDS:
+            values = [columns[field][i] for i in order]
+            if field in LIST_FIELDS:
+                index = np.zeros(len(codes) + 1, dtype=np.uint32)
+                np.cumsum([len(v) for v in values], out=index[1:])
+                arrays[field + '.index'] = index
+                values = [s for v in values for s in v]
+            arrays[field + '.offsets'], arrays[field + '.data'] = _string_table(values)
+        return cls(arrays)
+
+    def pack(self):
+        """序列化为 msgpack，数组保存为小端字节。"""
+        return msgpack.packb({
+            name: bytes(array) if name.endswith('.data') else np.asarray(array, dtype='<u4').tobytes()
+            for name, array in self.arrays.items()
+        })
+
+    @classmethod
+    def unpack(cls, data):
+        return cls({
+            name: value if name.endswith('.data') else np.frombuffer(value, dtype='<u4')
+            for name, value in msgpack.unpackb(data).items()
+        })
+
+    def __len__(self):
+        return len(self.codes)
+
+    def __contains__(self, code):
+        return self.find(code) >= 0
+
+    def build_rows(self, size):
+        """码位 0 ~ size - 1 的行号数组（见模块说明）。"""
+        rows = np.full(size, NO_ROW, dtype=np.uint32)
+        codes = np.asarray(self.codes, dtype=np.uint32)
+        rows[codes] = np.arange(len(codes), dtype=np.uint32)
+        return rows
+
+    def find(self, code):
+        """code 所在的行号，没有则返回 -1。"""
+        if self.rows is not None:
+            row = self.rows[code] if 0 <= code < len(self.rows) else NO_ROW
+            return row if row != NO_ROW else -1
+        i = bisect.bisect_left(self.codes, code)
+        return i if i < len(self.codes) and self.codes[i] == code else -1
+
+    def _field(self, row, field):
+        index, offsets, data = self.columns[field]
+        if index is None:
+            return data[offsets[row]:offsets[row + 1]].decode('utf-8')
+        return [data[offsets[j]:offsets[j + 1]].decode('utf-8') for j in range(index[row], index[row + 1])]
+
+    # get_name 与 get_entry 每帧都要调用，这里把查找和解码写在一起，省去函数调用的开销
+    def get_name(self, code):
+        """code 的名称，没有条目时返回 None。"""
+        row = self.find(code)
+        if row < 0:
+            return None
+        offsets, data = self._name_column
+        return data[offsets[row]:offsets[row + 1]].decode('utf-8')
+
+    def get_entry(self, code):
+        """code 的条目（dict：name 以及非空的列表字段），没有条目时返回 None。"""
+        row = self.find(code)
+        if row < 0:
+            return None
+        offsets, data = self._name_column
+        entry = {'name': data[offsets[row]:offsets[row + 1]].decode('utf-8')}
+        for field, index, offsets, data in self._list_columns:
+            start, stop = index[row], index[row + 1]
+            if stop > start:
+                entry[field] = [data[offsets[j]:offsets[j + 1]].decode('utf-8') for j in range(start, stop)]
+        return entry
+
+    def to_entries(self):
+        """还原为 {码位: 条目 dict}（包含全部字段），供生成数据的脚本修改后重新构建。"""
+        entries = {}
+        for row, code in enumerate(self.codes):
+            entries[code] = {'code': f'U+{code:04X}'}
+            for field in NAMES_FIELDS:
+                entries[code][field] = self._field(row, field)
+        return entries
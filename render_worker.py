@@ -0,0 +1,79 @@
+from tqdm import tqdm
+from uni_flash import get_groups, load_custom_fonts, load_info_fonts, render_frames, write_video
+from code_ranges import CodeRanges
+from glyph_cache import GlyphCache
+from work_queue import SegmentQueue
+
+import os
+
+# 每渲染这么多帧更新一次认领时间
+HEARTBEAT_FRAMES = 100
+
+
+def _with_heartbeat(frames, queue, segment):
+    for i, item in enumerate(frames):
+        if i % HEARTBEAT_FRAMES == 0:
+            queue.heartbeat(segment)
+        yield item
+
+
+def run_worker(segments_dir, workers=None, glyph_cache=None, merge=True, quiet=False, panel_cache=False):
+    """
+    分段渲染的工作进程：读取协调进程在段目录中发布的任务，反复认领、渲染并编码一段，直到没有可认领的段。
+    段目录需要能被协调进程与各工作进程访问（共享目录），任务中的自定义字体路径在本机也必须有效。
+    返回本进程完成的段数。
+    """
+    queue = SegmentQueue(segments_dir)
+    job = queue.read_job()
+    codes = CodeRanges(job['codes']) if job['ranges'] else job['codes']
+    groups, group_lens = get_groups(codes)
+    video_properties = job['video_properties']
+    img_props = {
+        'width': video_properties['width'],
+        'height': video_properties['height']
+    }
+    render_args = (
+        groups, group_lens, job['dimensions'], img_props, load_info_fonts(),
+        load_custom_fonts(job['fonts']), dict(job['opts'], glyph_cache=glyph_cache, panel_cache=panel_cache)
+    )
+
+    done = 0
+    while (segment := queue.claim(job['segments'])) is not None:
+        start, stop = segment['start'], segment['stop']
+        part_path = queue.part_path(segment)
+        frames = render_frames(codes[start:stop], *render_args, workers=workers, start_index=start)
+        with tqdm(total=stop - start, desc=segment['file'], disable=quiet) as progress:
+            write_video(part_path, video_properties, _with_heartbeat(frames, queue, segment), progress)
+        queue.finish(segment, part_path)
+        done += 1
+
+    # 同一个缓存目录同时只能有一个进程合并，由本机启动的多个工作进程交给协调进程合并
+    if glyph_cache and merge:
+        GlyphCache(glyph_cache).merge()
+    return done
+
+
+if __name__ == '__main__':
+    import argparse
+
+    CUR_FOLDER = os.path.dirname(__file__)
+    parser = argparse.ArgumentParser(description='这是分段渲染的工作进程脚本，从共享的段目录中认领并渲染由 uni_flash.py -dist 发布的段。')
+    parser.add_argument('segments_dir', type=str,
+                        help='段目录，即协调进程的 -seg 目录。')
+    parser.add_argument('-w', '--workers', type=int,
+                        help='渲染使用的进程数，默认为 CPU 核数。')
+    parser.add_argument('-gc', '--glyph_cache', type=str, nargs='?',
+                        const=os.path.join(CUR_FOLDER, '.cache', 'glyphs'),
+                        help='启用字形位图缓存，可指定缓存目录，默认为当前路径下的 .cache/glyphs。')
+    parser.add_argument('-pc', '--panel_cache', action='store_true',
+                        help='把信息栏的位图也存入字形位图缓存（与 -gc 一起使用）。')
+    parser.add_argument('-nm', '--no_merge', action='store_true',
+                        help='结束时不合并字形位图缓存（由本机的协调进程统一合并）。')
+    parser.add_argument('-q', '--quiet', action='store_true',
+                        help='不显示进度条。')
+    args = parser.parse_args()
+
+    if args.panel_cache and not args.glyph_cache:
+        parser.error('-pc/--panel_cache 需要与 -gc 一起使用。')
+
+    run_worker(args.segments_dir, args.workers, args.glyph_cache, not args.no_merge, args.quiet, args.panel_cache)
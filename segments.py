@@ -0,0 +1,92 @@
+import numpy as np
+
+import subprocess
+import os
+import json
+import hashlib
+
+MANIFEST_NAME = 'manifest.json'
+
+
+def split_segments(group_lens, segment_frames):
+    """
+    按分组（区段）切分帧序号，返回 [(start, stop), ...]；
+    超过 segment_frames 帧的分组再切成多段，使每段都能在较短时间内完成。
+    """
+    segments = []
+    start = 0
+    for group_len in group_lens:
+        stop = start + group_len
+        for seg_start in range(start, stop, segment_frames):
+            segments.append((seg_start, min(seg_start + segment_frames, stop)))
+        start = stop
+    return segments
+
+
+def get_job_key(codes, settings):
+    """由全部码位与影响画面、编码的参数得出的键，用来确认段目录属于同一个任务。"""
+    digest = hashlib.sha1()
+    digest.update(json.dumps(settings, sort_keys=True, ensure_ascii=False).encode('utf-8'))
+    digest.update(np.fromiter(codes, dtype='<u4').tobytes())
+    return digest.hexdigest()
+
+
+class SegmentManifest:
+    """
+    分段渲染的清单，保存为段目录下的 manifest.json：
+      {'key': 任务的键, 'segments': [{'start', 'stop', 'file', 'done'}, ...]}
+    每段编码完成、文件原子地改名后才标记为 done，中断后重新运行同一任务时跳过已完成的段。
+    """
+
+    def __init__(self, segments_dir, key, segments):
+        self.segments_dir = segments_dir
+        self.key = key
+        self.path = os.path.join(segments_dir, MANIFEST_NAME)
+        os.makedirs(segments_dir, exist_ok=True)
+        if os.path.exists(self.path):
+            with open(self.path, encoding='utf-8') as f:
+                manifest = json.load(f)
+            if manifest['key'] != key:
+                raise ValueError(f'段目录 {segments_dir} 属于参数不同的另一个任务，请删除它或换一个目录。')
+            self.segments = manifest['segments']
+        else:
+            self.segments = [
+                {'start': start, 'stop': stop, 'file': f'{i:05d}.mp4', 'done': False}
+                for i, (start, stop) in enumerate(segments)
+            ]
+            self.save()
+
+    def save(self):
+        with open(self.path + '.tmp', 'w', encoding='utf-8') as f:
+            json.dump({'key': self.key, 'segments': self.segments}, f, ensure_ascii=False, indent=1)
+        os.replace(self.path + '.tmp', self.path)
+
+    def segment_path(self, segment):
+        return os.path.join(self.segments_dir, segment['file'])
+
+    def pending(self):
+        return [segment for segment in self.segments if not segment['done']]
+
+    def mark_done(self, segment):
+        segment['done'] = True
+        self.save()
+
+    def done_frames(self):
+        return sum(segment['stop'] - segment['start'] for segment in self.segments if segment['done'])
+
+
+def concat_segments(segment_paths, out_path, audio_path=None):
+    """用 ffmpeg 的 concat 分离器无损拼接各段（-c copy），可同时循环混入背景音乐。"""
+    list_path = out_path + '.concat.txt'
+    with open(list_path, 'w', encoding='utf-8') as f:
+        for path in segment_paths:
+            escaped = os.path.abspath(path).replace("'", "'\\''")
+            f.write(f"file '{escaped}'\n")
+    command = ['ffmpeg', '-hide_banner', '-loglevel', 'error', '-y', '-f', 'concat', '-safe', '0', '-i', list_path]
+    if audio_path:
+        command += ['-stream_loop', '-1', '-i', audio_path, '-map', '0:v', '-map', '1:a', '-shortest']
+    command += ['-c', 'copy', out_path]
+    try:
+        subprocess.run(command, check=True)
+    finally:
+        os.remove(list_path)
@@ -0,0 +1,158 @@
+import numpy as np
+
+import os
+import csv
+import json
+import time
+from array import array
+
+# 工作进程中逐帧计时的阶段，按 generate_an_image 中的先后顺序
+WORKER_STAGES = (
+    'metadata',                 # 字符信息、分组、名称与 NamesList 条目
+    'font_select',              # 选择字体（默认字体第一次用到时加载）
+    'template',                 # 测量底部文本并复制帧模板
+    'auto_width',               # 所有 auto_width 调用
+    'draw_text:middle_bottom',  # 各 draw.text 调用
+    'draw_text:right_bottom',
+    'draw_text:left_bottom',
+    'progress_bar',             # 进度条与百分比
+    'draw_text:top',
+    'glyph',                    # 绘制字形或无法显示时的提示
+    'frame_copy'                # 把图像写入共享内存帧槽
+)
+# 主进程中逐帧计时的阶段
+MAIN_STAGES = (
+    'ipc_wait',                 # 等待工作进程返回这一帧（流水线未能掩盖的时间）
+    'encode',                   # 把帧交给编码器
+    'dispatch'                  # 计算下一个任务的字符信息并提交
+)
+STAGES = WORKER_STAGES + MAIN_STAGES
+
+
+class StageTimer:
+    """
+    工作进程中的逐帧计时器：每帧开始时调用 start()，每个阶段结束时调用 lap(阶段)，
+    同一阶段多次计时的耗时累加。result() 返回 (pid, 各阶段耗时)，随帧一起交给主进程。
+    """
+
+    def __init__(self):
+        self.index = {stage: i for i, stage in enumerate(WORKER_STAGES)}
+        self.times = [0.0] * len(WORKER_STAGES)
+        self.last = 0.0
+
+    def start(self):
+        self.times = [0.0] * len(WORKER_STAGES)
+        self.last = time.perf_counter()
+
+    def lap(self, stage):
+        now = time.perf_counter()
+        self.times[self.index[stage]] += now - self.last
+        self.last = now
+
+    def result(self):
+        return os.getpid(), self.times
+
+
+class NullTimer:
+    """不计时时使用的空计时器，接口与 StageTimer 相同。"""
+
+    def start(self):
+        pass
+
+    def lap(self, stage):
+        pass
+
+    def result(self):
+        return None
+
+
+NULL_TIMER = NullTimer()
+
+
+class FrameProfile:
+    """
+    主进程中收集逐帧的各阶段耗时：工作进程的阶段随帧返回，由 add_frame 记录；
+    主进程的阶段由 add 计入最近一帧。耗时以紧凑的 array 保存，每帧约 (len(STAGES) + 2) × 8 字节。
+    """
+
+    def __init__(self):
+        self.index = {stage: i for i, stage in enumerate(STAGES)}
+        self.code_indexes = array('q')
+        self.pids = array('q')
+        self.samples = array('d')
+        self.started = time.perf_counter()
+        self.finished = None
+
+    def add_frame(self, code_index, worker_result):
+        pid, times = worker_result
+        self.code_indexes.append(code_index)
+        self.pids.append(pid)
+        self.samples.extend(times)
+        self.samples.extend([0.0] * len(MAIN_STAGES))
+
+    def add(self, stage, seconds):
+        if self.code_indexes:
+            self.samples[len(self.samples) - len(STAGES) + self.index[stage]] += seconds
+
+    def finish(self):
+        self.finished = time.perf_counter()
+
+    def table(self):
+        return np.frombuffer(self.samples, dtype=np.float64).reshape(-1, len(STAGES))
+
+    def summary(self):
+        data = self.table()
+        frames = len(data)
+        wall_time = (self.finished or time.perf_counter()) - self.started
+        totals = data.sum(axis=0)
+        stages = {}
+        for i, stage in enumerate(STAGES):
+            column = data[:, i]
+            stages[stage] = {
+                'total': float(totals[i]),
+                'mean_ms': float(column.mean() * 1000) if frames else 0.0,
+                'p50_ms': float(np.percentile(column, 50) * 1000) if frames else 0.0,
+                'p95_ms': float(np.percentile(column, 95) * 1000) if frames else 0.0,
+                'share': float(totals[i] / totals.sum()) if totals.sum() else 0.0
+            }
+
+        workers = {}
+        pids = np.frombuffer(self.pids, dtype=np.int64)
+        for pid in np.unique(pids).tolist():
+            rows = data[pids == pid, :len(WORKER_STAGES)]
+            workers[str(pid)] = {
+                'frames': len(rows),
+                'busy': float(rows.sum()),
+                'stages': dict(zip(WORKER_STAGES, rows.sum(axis=0).tolist()))
+            }
+        return {
+            'frames': frames,
+            'wall_time': wall_time,
+            'fps': frames / wall_time if wall_time else 0.0,
+            'stages': stages,
+            'workers': workers
+        }
+
+    def write(self, path):
+        """路径以 .csv 结尾时写出逐帧的耗时（秒），否则写出 JSON 格式的汇总（见 summary）。"""
+        if path.lower().endswith('.csv'):
+            with open(path, 'w', newline='', encoding='utf-8') as f:
+                writer = csv.writer(f)
+                writer.writerow(['code_index', 'pid', *STAGES])
+                for code_index, pid, row in zip(self.code_indexes, self.pids, self.table().tolist()):
+                    writer.writerow([code_index, pid, *(f'{t:.6f}' for t in row)])
+        else:
+            with open(path, 'w', encoding='utf-8') as f:
+                json.dump(self.summary(), f, ensure_ascii=False, indent=2)
+
+
+def print_profile_summary(summary):
+    print(f'共 {summary["frames"]} 帧，耗时 {summary["wall_time"]:.1f} 秒（{summary["fps"]:.1f} 帧/秒）')
+    print(f'{"阶段":<24}{"总计(s)":>8}{"每帧(ms)":>8}{"p50(ms)":>10}{"p95(ms)":>10}{"占比":>8}')
+    for stage, stat in summary['stages'].items():
+        print(f'{stage:<26}{stat["total"]:>10.2f}{stat["mean_ms"]:>10.3f}'
+              f'{stat["p50_ms"]:>10.3f}{stat["p95_ms"]:>10.3f}{stat["share"] * 100:>9.1f}%')
+    print('各工作进程：')
+    for pid, worker in summary['workers'].items():
+        per_frame = worker['busy'] / worker['frames'] * 1000 if worker['frames'] else 0.0
+        print(f'  {pid}：{worker["frames"]} 帧，忙碌 {worker["busy"]:.2f} 秒（每帧 {per_frame:.3f} ms）')
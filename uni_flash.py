@@ -1,36 +1,54 @@
 from PIL import Image, ImageDraw, ImageFont
 from tqdm import tqdm
-from fontTools.ttLib import TTFont
-import cv2
 import numpy as np
 from concurrent.futures import ProcessPoolExecutor
-from control_map import get_char, get_char_in_last_resort, CTRLS
+from control_map import get_char, get_char_in_last_resort, CTRLS, NOT_CHAR_BITMAP
+from unicode_data import CodeBitmap
+from code_ranges import CodeRanges
+from frame_ring import FrameRing
+from glyph_cache import GlyphCache
+from font_cache import FontInfoCache
+from video_encoder import open_video_writer, ENCODERS, FFMPEG_CODECS, FFMPEG_PRESETS
+from frame_dedup import FrameDiffStats
+from segments import SegmentManifest, split_segments, get_job_key, concat_segments
+from work_queue import SegmentQueue, POLL_INTERVAL
+from info_panel import PanelStore, get_panel_lines
+from stage_profiler import StageTimer, NULL_TIMER, FrameProfile, print_profile_summary
+import unicode_data
 
 import os
 import re
+import sys
+import subprocess
 import csv
-import msgpack
-import zlib
 import bisect
+import time
 import itertools
+import functools
+from collections import deque
 
 # 常量的定义
 EXAMPLE_FONT_SIZE = 220
+# 每个工作进程对应的共享内存帧槽数，决定了同时在途的帧数
+FRAME_SLOTS_PER_WORKER = 2
+# 每个工作进程缓存的帧模板（按平面、区段区分）数量
+FRAME_TEMPLATE_CACHE_SIZE = 32
+# get_code_infos 每次批量计算的码位数
+CODE_INFO_CHUNK_SIZE = 4096
+# 每个工作进程缓存的 auto_width 结果与整段文本宽度的数量
+AUTO_WIDTH_CACHE_SIZE = 4096
+TEXT_MEASURE_CACHE_SIZE = 4096
+# 分段渲染时每段的最大帧数，超过的分组（区段）再切成多段
+SEGMENT_FRAMES = 9000
+BG_COLOR = 20
+TEXT_COLOR = 235
 
 UNICODE_RE = re.compile(r'^([0-9a-fA-F]|10)?[0-9a-fA-F]{0,4}$')
 
 CUR_FOLDER = os.path.dirname(__file__)
 
-NOT_CHAR = {
-    0xFFFE, 0xFFFF, 0x1FFFE, 0x1FFFF, 0x2FFFE,
-    0x2FFFF, 0x3FFFE, 0x3FFFF, 0x4FFFE, 0x4FFFF,
-    0x5FFFE, 0x5FFFF, 0x6FFFE, 0x6FFFF, 0x7FFFE,
-    0x7FFFF, 0x8FFFE, 0x8FFFF, 0x9FFFE, 0x9FFFF,
-    0xAFFFE, 0xAFFFF, 0xBFFFE, 0xBFFFF, 0xCFFFE,
-    0xCFFFF, 0xDFFFE, 0xDFFFF, 0xEFFFE, 0xEFFFF,
-    0xFFFFE, 0xFFFFF, 0x10FFFE, 0x10FFFF,
-    *range(0xFDD0, 0xFDF0)
-}
+NOT_CHAR = NOT_CHAR_BITMAP
+PRIVATE_USE = CodeBitmap.from_ranges([(0xE000, 0xF8FF), (0xF0000, 0xFFFFD), (0x100000, 0x10FFFD)])
 
 with open(
     os.path.join(CUR_FOLDER, 'ToolFiles', 'Blocks.csv'),
@@ -47,6 +65,7 @@ with open(
     }
     BLOCK_START_LIST = [int(line[0].split('..')[0], 16) for line in reader]
     BLOCK_NAMES = [line[2] for line in reader]
+    BLOCK_END_LIST = [int(line[0].split('..')[1], 16) for line in reader]
 
 with open(
     os.path.join(CUR_FOLDER, 'ToolFiles', 'Planes.csv'),
@@ -61,41 +80,147 @@ with open(
         ) for line in reader
     ]
 
-DEFINED_CHARACTER_LIST_PATH = os.path.join(CUR_FOLDER, 'ToolFiles', 'DefinedCharacterList.mp.zlib')
-NAMES_LIST_PATH = os.path.join(CUR_FOLDER, 'ToolFiles', 'NamesList.mp.zlib')
-VERSIONS_PATH = os.path.join(CUR_FOLDER, 'ToolFiles', 'Versions.mp.zlib')
-COMMON_NAMES_PATH = os.path.join(CUR_FOLDER, 'ToolFiles', 'CommonNames.mp.zlib')
-FONT_FALLBACK_PATH = os.path.join(CUR_FOLDER, 'ToolFiles', 'FontFallback.mp.zlib')
-
-with (
-    open(DEFINED_CHARACTER_LIST_PATH, 'rb') as dclf,
-    open(NAMES_LIST_PATH, 'rb') as nlf,
-    open(VERSIONS_PATH, 'rb') as vf,
-    open(COMMON_NAMES_PATH, 'rb') as cnf,
-    open(FONT_FALLBACK_PATH, 'rb') as fbf
-):
-    DEFINED_CHARACTER_LIST = set(msgpack.unpackb(zlib.decompress(dclf.read()))) - CTRLS
-    NAMES_LIST = msgpack.unpackb(zlib.decompress(nlf.read()), strict_map_key=False)
-    VERSIONS = msgpack.unpackb(zlib.decompress(vf.read()), strict_map_key=False, use_list=False)
-    COMMON_NAMES = msgpack.unpackb(zlib.decompress(cnf.read()), strict_map_key=False, use_list=False)
-    FONTS = msgpack.unpackb(zlib.decompress(fbf.read()))
-
-FONTS = {
-    k: (set(v), ImageFont.truetype(
-        os.path.join(CUR_FOLDER, 'fonts', k + '.ttf'),
+
+
+def build_interval_index(ranges):
+    # 把 ((start, end, value), ...) 转为按起点排序的三个列表，供 find_interval 用 bisect 查找
+    items = sorted(ranges)
+    return (
+        [start for start, _, _ in items],
+        [end for _, end, _ in items],
+        [value for _, _, value in items]
+    )
+
+
+def find_interval(index, code):
+    starts, ends, values = index
+    i = bisect.bisect_right(starts, code) - 1
+    if i != -1 and code <= ends[i]:
+        return values[i]
+    return None
+
+
+@functools.cache
+def get_common_name_index():
+    return build_interval_index(unicode_data.get_common_names())
+
+
+@functools.cache
+def get_fallback_font(font_name):
+    # 默认字体在第一次用到时才加载
+    return ImageFont.truetype(
+        os.path.join(CUR_FOLDER, 'fonts', font_name + '.ttf'),
         EXAMPLE_FONT_SIZE
-    ))
-    for k, v in FONTS.items()
-}
+    )
+
+INFO_FONT_PATH = os.path.join(CUR_FOLDER, 'Sarasa-Mono-SC-Regular.ttf')
+FONT_PATH_MLST = os.path.join(CUR_FOLDER, 'Monu-Last.ttf')
+FONT_PATH_LAST = os.path.join(CUR_FOLDER, 'LastResort-PUA.ttf')
+font_name_mlst = 'Monu-Last'
+font_name_last = 'LastResort-Regular'
+font_mlst = None
+font_last = None
+# 字形位图缓存，由 load_glyph_cache 在工作进程中设置
+glyph_cache = None
+# 逐帧的分阶段计时器，由 load_stage_timer 在工作进程中设置
+stage_timer = NULL_TIMER
+# 自定义字体的 cmap 与字体名的缓存目录
+FONT_INFO_CACHE_DIR = os.path.join(CUR_FOLDER, '.cache', 'fonts')
+# 只影响本机（缓存、性能分析）而不影响画面的 opts，不计入分段渲染任务的键，也不发给其他机器的工作进程
+LOCAL_OPTS = ('glyph_cache', 'panel_cache', 'profile')
+# 影响段文件内容的视频参数，计入分段渲染任务的键
+VIDEO_JOB_KEYS = ('width', 'height', 'fps', 'encoder', 'codec', 'preset', 'crf', 'threads')
+RENDER_WORKER_PATH = os.path.join(CUR_FOLDER, 'render_worker.py')
+
+# 各字体中单个字符的宽度：{字体: {字符: 宽度}}
+_CHAR_WIDTHS = {}
+# 只用于测量文本尺寸（textbbox）的画布，测量结果与画布大小无关
+_MEASURE_DRAW = ImageDraw.Draw(Image.new('L', (1, 1)))
 
 # 字体相关的函数
-def get_font_name(font):
-    return font['name'].getName(6, 3, 1, 1033).string.decode('utf-8').replace('\0', '')
+def load_info_fonts():
+    return {
+        'top': ImageFont.truetype(INFO_FONT_PATH, 12),
+        'right_middle': ImageFont.truetype(INFO_FONT_PATH, 25),
+        'left_bottom': ImageFont.truetype(INFO_FONT_PATH, 25),
+        'middle_bottom': ImageFont.truetype(INFO_FONT_PATH, 20),
+        'right_bottom': ImageFont.truetype(INFO_FONT_PATH, 40),
+        'cannot_display_default': ImageFont.truetype(INFO_FONT_PATH, 40),
+        'percent': ImageFont.truetype(INFO_FONT_PATH, 20)
+    }
+
+
+def load_last_fonts(last_type):
+    global font_mlst, font_last
+    if last_type == 2 and font_mlst is None:
+        font_mlst = ImageFont.truetype(FONT_PATH_MLST, EXAMPLE_FONT_SIZE)
+    elif last_type == 1 and font_last is None:
+        font_last = ImageFont.truetype(FONT_PATH_LAST, EXAMPLE_FONT_SIZE)
+
+
+def load_glyph_cache(cache_dir):
+    global glyph_cache
+    if cache_dir and glyph_cache is None:
+        glyph_cache = GlyphCache(cache_dir)
+
+
+def load_stage_timer(enabled):
+    global stage_timer
+    if enabled and stage_timer is NULL_TIMER:
+        stage_timer = StageTimer()
+
+
+@functools.cache
+def get_panel_store(font, width):
+    return PanelStore.open(font, width)
+
+
+@functools.cache
+def get_font_info_cache():
+    return FontInfoCache(FONT_INFO_CACHE_DIR)
+
 
+def get_font_info(path):
+    # (码位数组, 字体名)，每个字体最多解析一次，之后的运行从磁盘缓存读取
+    return get_font_info_cache().get(path)
 
-def get_all_codes_from_font(font):
-    codes = set(font.getBestCmap().keys())
-    return codes
+
+def get_all_codes_from_font(path):
+    return get_font_info(path)[0]
+
+
+def load_custom_fonts(custom_font_paths):
+    # 只在主进程取得一次 cmap 与字体名，工作进程只需据路径打开字体
+    return tuple((path, *get_font_info(path)) for path in custom_font_paths)
+
+
+def build_font_table(custom_fonts, opts):
+    """
+    每次运行构建一次的码位→字体表：长度为 0x110000 的 uint8 数组，
+    table[code] 为 code 所用字体的序号加一，0 表示没有可用字体（使用最后字体）。
+    序号先是 custom_fonts 中的自定义字体（按给出的顺序优先），然后是 FontFallback 中的默认字体；
+    默认字体只用于要显示的码位（定义的非私用区字符，以及 -sp/-sc/-sr 打开的码位）。
+    """
+    fallback_names = unicode_data.get_font_names()
+    if len(custom_fonts) + len(fallback_names) > 255:
+        raise ValueError(f'字体太多：{len(custom_fonts)} 个自定义字体和 {len(fallback_names)} 个默认字体，最多 255 个。')
+
+    private = PRIVATE_USE.to_bools()
+    show = get_defined_bitmap().to_bools() & ~private
+    if opts['show_private']:
+        show |= private
+    if opts['show_control']:
+        show |= CTRLS.to_bools()
+    if opts['show_reserved']:
+        show |= get_reserved_bitmap().to_bools()
+    fallback = unicode_data.get_fallback_table()
+    table = np.where(show & (fallback > 0), fallback + len(custom_fonts), 0).astype(np.uint8)
+
+    # 先写优先级低的字体，使优先级高的字体覆盖它们
+    for i in reversed(range(len(custom_fonts))):
+        cmap = custom_fonts[i][1]
+        table[cmap[cmap < len(table)]] = i + 1
+    return table
 
 
 # 字符信息相关的函数
@@ -104,62 +229,57 @@ def get_char_name(code):
         return f'<not a character-{code:04X}>'
     if 0xD800 <= code <= 0xDFFF:
         return f'SURROGATE-{code:04X}'
-    name = NAMES_LIST.get(
-        str(code),
-        {'name': None}
-    )['name']
+    name = unicode_data.get_name(code)
     
     if name is not None:
         return name
-    else:
-        for k, v in COMMON_NAMES.items():
-            s, e = k
-            if s <= code <= e:
-                return v.replace('#', f'{code:04X}')
+    common_name = find_interval(get_common_name_index(), code)
+    if common_name is not None:
+        return common_name.replace('#', f'{code:04X}')
     
     return f'<undefined character-{code:04X}>'
 
 
 def get_char_version(code):
-    version = VERSIONS['single'].get(code)
+    version = unicode_data.get_version(code)
     if version is not None:
         return version
-    else:
-        for k, v in VERSIONS['range'].items():
-            s, e = k
-            if s <= code <= e:
-                return v
     
     return 'unassigned'
 
 
+@functools.cache
+def get_defined_bitmap():
+    # DefinedCharacterList 中除控制字符外的码位，加上私用区
+    return unicode_data.get_defined_list() - CTRLS | PRIVATE_USE
+
+
+@functools.cache
+def get_defined_ranges():
+    # 与 get_defined_bitmap 相同的码位集合，以区间表示，用于 --skip_undefined
+    return CodeRanges.from_bools(get_defined_bitmap().to_bools())
+
+
 def is_defined(code):
-    if (
-        code in DEFINED_CHARACTER_LIST
-        or 0xE000 <= code <= 0xF8FF
-        or 0xF0000 <= code <= 0xFFFFD
-        or 0x100000 <= code <= 0x10FFFD
-    ):
-        return True
-    return False
+    return code in get_defined_bitmap()
 
 
 def is_control(code):
     return code in CTRLS
 
 
+@functools.cache
+def get_reserved_bitmap():
+    # 名称为 <reserved-...> 的码位，与 get_char_name 一致地排除非字符和替代字符
+    return unicode_data.get_reserved_list() - NOT_CHAR - CodeBitmap.from_ranges([(0xD800, 0xDFFF)])
+
+
 def is_reserved(code):
-    if get_char_name(code).startswith('<reserved'):
-        return True
-    return False
+    return code in get_reserved_bitmap()
 
 
 def is_private_use(code):
-    if (0xE000 <= code <= 0xF8FF
-        or 0xF0000 <= code <= 0xFFFFD
-        or 0x100000 <= code <= 0x10FFFD):
-        return True
-    return False
+    return code in PRIVATE_USE
 
 # 区段相关的函数
 def get_block(code):
@@ -180,10 +300,61 @@ def get_block_infos(block_name):
     )
 
 
-def get_group(groups, group_lens, code_index):
-    for i in range(0, len(group_lens)):
-        if sum(group_lens[:i + 1]) >= code_index + 1:
-            return groups[i], code_index - sum(group_lens[:i])
+def get_groups(codes):
+    if isinstance(codes, range) and codes.step == 1:
+        return get_range_groups(codes)
+    if isinstance(codes, CodeRanges):
+        return get_code_ranges_groups(codes)
+    groups = [
+        (
+            (*get_block_infos(k)[:-1], ),
+            sum(1 for _ in g)
+        ) for k, g in itertools.groupby(codes, get_block)
+    ]
+    group_lens = [l for _, l in groups]
+    return groups, group_lens
+
+
+def get_range_groups(codes):
+    # 连续范围可直接按区段边界切分，不必逐个码位调用 get_block
+    groups = []
+    code, stop = codes.start, codes.stop
+    while code < stop:
+        block_name = get_block(code)
+        if block_name is not None:
+            end = get_block_infos(block_name)[3][1] + 1
+        else:
+            # 区段之间的空隙，一直延续到下一个区段的起点
+            index = bisect.bisect_right(BLOCK_START_LIST, code)
+            end = BLOCK_START_LIST[index] if index < len(BLOCK_START_LIST) else stop
+        end = min(end, stop)
+        groups.append(((*get_block_infos(block_name)[:-1], ), end - code))
+        code = end
+    group_lens = [l for _, l in groups]
+    return groups, group_lens
+
+
+def get_code_ranges_groups(codes):
+    # 逐个区间按区段边界切分，与 groupby 一样合并相邻的同一区段的分组
+    groups = []
+    for codes_range in codes.ranges():
+        for group in get_range_groups(codes_range)[0]:
+            if groups and groups[-1][0] == group[0]:
+                groups[-1] = (group[0], groups[-1][1] + group[1])
+            else:
+                groups.append(group)
+    group_lens = [l for _, l in groups]
+    return groups, group_lens
+
+
+def get_group_ends(group_lens):
+    # 每个分组结束处（不含）的帧序号，即 group_lens 的前缀和
+    return list(itertools.accumulate(group_lens))
+
+
+def get_group(groups, group_ends, code_index):
+    i = bisect.bisect_right(group_ends, code_index)
+    return groups[i], code_index - (group_ends[i - 1] if i else 0)
 
 
 # 编码相关的函数
@@ -232,40 +403,194 @@ def to_utf16le_hex(code):
         return be[2:4] + be[:2] + be[6:8] + be[4:6]
 
 
+# 批量计算字符信息的函数
+CODE_INFO_COLUMNS = (
+    'utf8', 'utf8_len', 'utf16be', 'utf16le', 'utf16_len', 'plane', 'block', 'version',
+    'defined', 'control', 'private', 'reserved', 'not_char', 'font'
+)
+
+
+def get_code_infos(codes, font_table=None, columns=CODE_INFO_COLUMNS):
+    """
+    用 NumPy 批量计算 codes（码位数组）的字符信息，返回 {列名: 数组}，每行对应一个码位：
+      utf8、utf16be、utf16le   (n, 4) 的 uint8 数组，编码后的字节，只有前 utf8_len / utf16_len 个有效；
+      plane、block             平面、区段的序号，不在任何区段中时 block 为 -1；
+      version                  版本在 unicode_data.get_version_names() 中的序号加一，0 表示未分配；
+      defined、control、private、reserved、not_char
+                               与 is_defined、is_control、is_private_use、is_reserved 以及 NOT_CHAR 相同的布尔值；
+      font                     font_table（见 build_font_table）中的字体序号加一，未给出 font_table 时没有这一列。
+    columns 指定只计算其中的哪些列。
+    """
+    codes = np.asarray(codes, dtype=np.int64)
+    infos = {}
+    if 'utf8' in columns or 'utf8_len' in columns:
+        lengths = 1 + (codes >= 0x80) + (codes >= 0x800) + (codes >= 0x10000)
+        utf8 = np.zeros((len(codes), 4), dtype=np.uint8)
+        # 首字节：多字节序列的前缀加上最高的几位
+        utf8[:, 0] = np.array([0, 0, 0xC0, 0xE0, 0xF0])[lengths] | codes >> 6 * (lengths - 1)
+        for k in range(1, 4):
+            shift = np.maximum(6 * (lengths - 1 - k), 0)
+            utf8[:, k] = np.where(lengths > k, 0x80 | codes >> shift & 0x3F, 0)
+        infos['utf8'], infos['utf8_len'] = utf8, lengths.astype(np.uint8)
+    if {'utf16be', 'utf16le', 'utf16_len'} & set(columns):
+        supplementary = codes >= 0x10000
+        units = np.zeros((len(codes), 2), dtype=np.uint16)
+        units[:, 0] = np.where(supplementary, 0xD800 + (codes - 0x10000 >> 10), codes)
+        units[:, 1] = np.where(supplementary, 0xDC00 + (codes - 0x10000 & 0x3FF), 0)
+        infos['utf16be'] = units.astype('>u2').view(np.uint8)
+        infos['utf16le'] = units.astype('<u2').view(np.uint8)
+        infos['utf16_len'] = np.where(supplementary, 4, 2).astype(np.uint8)
+    if 'plane' in columns:
+        infos['plane'] = np.searchsorted(PLANE_START_LIST, codes, side='right') - 1
+    if 'block' in columns:
+        block = np.searchsorted(BLOCK_START_LIST, codes, side='right') - 1
+        in_block = (block != -1) & (codes <= np.array(BLOCK_END_LIST)[block])
+        infos['block'] = np.where(in_block, block, -1)
+    if 'version' in columns:
+        infos['version'] = unicode_data.get_version_table()[codes]
+    bitmaps = {
+        'defined': get_defined_bitmap,
+        'control': lambda: CTRLS,
+        'private': lambda: PRIVATE_USE,
+        'reserved': get_reserved_bitmap,
+        'not_char': lambda: NOT_CHAR
+    }
+    for name, get_bitmap in bitmaps.items():
+        if name in columns:
+            infos[name] = get_bitmap().contains(codes)
+    if 'font' in columns and font_table is not None:
+        infos['font'] = font_table[codes]
+    return infos
+
+
+# pack_code_infos 中每个码位的记录：utf8[4] utf16be[4] utf8_len utf16_len plane version flags font，共 14 字节
+CODE_INFO_RECORD_SIZE = 14
+# flags 的各位，依次为 1、2、4、8、16
+CODE_INFO_FLAGS = ('defined', 'control', 'private', 'reserved', 'not_char')
+
+
+def pack_code_infos(infos):
+    """
+    把 get_code_infos 的结果按码位打包为定长的字节串记录（见 CODE_INFO_RECORD_SIZE），返回 bytes 的列表。
+    记录直接随任务发给工作进程，由 unpack_code_info 在工作进程中转为 dict。
+    """
+    records = np.zeros((len(infos['plane']), CODE_INFO_RECORD_SIZE), dtype=np.uint8)
+    records[:, 0:4] = infos['utf8']
+    records[:, 4:8] = infos['utf16be']
+    records[:, 8] = infos['utf8_len']
+    records[:, 9] = infos['utf16_len']
+    records[:, 10] = infos['plane']
+    records[:, 11] = infos['version']
+    for bit, name in enumerate(CODE_INFO_FLAGS):
+        records[:, 12] |= infos[name].astype(np.uint8) << bit
+    records[:, 13] = infos['font']
+    data = records.tobytes()
+    return [data[i:i + CODE_INFO_RECORD_SIZE] for i in range(0, len(data), CODE_INFO_RECORD_SIZE)]
+
+
+def unpack_code_info(record):
+    """把 pack_code_infos 的一条记录转为渲染一帧所需的 dict。"""
+    utf8_len, utf16_len, plane, version, flags, font = record[8:14]
+    utf16be = record[4:4 + utf16_len]
+    return {
+        'plane': plane,
+        'version': unicode_data.get_version_names()[version - 1] if version else 'unassigned',
+        **{name: bool(flags >> bit & 1) for bit, name in enumerate(CODE_INFO_FLAGS)},
+        'font': font,
+        'utf8': record[:utf8_len].hex(' ').upper(),
+        'utf16be': utf16be.hex(' ').upper(),
+        # 每个 UTF-16 码元的两个字节交换位置
+        'utf16le': bytes(utf16be[i ^ 1] for i in range(utf16_len)).hex(' ').upper()
+    }
+
+
+def iter_code_infos(codes, font_table):
+    """按块批量计算，逐个产出 (code, record)，record 见 pack_code_infos，不会把 codes 整个展开。"""
+    codes = iter(codes)
+    while chunk := list(itertools.islice(codes, CODE_INFO_CHUNK_SIZE)):
+        yield from zip(chunk, pack_code_infos(get_code_infos(chunk, font_table)))
+
+
 # 其他函数
+@functools.lru_cache(maxsize=TEXT_MEASURE_CACHE_SIZE)
+def measure_text(font, text):
+    return font.getlength(text)
+
+
+def get_char_widths(font, string):
+    # 单个字符的宽度只与字体和字符有关，按字体缓存，各帧重复出现的字符不再测量
+    widths = _CHAR_WIDTHS.get(font)
+    if widths is None:
+        widths = _CHAR_WIDTHS[font] = {}
+    char_widths = []
+    for char in string:
+        char_width = widths.get(char)
+        if char_width is None:
+            char_width = widths[char] = font.getlength(char)
+        char_widths.append(char_width)
+    return char_widths
+
+
+@functools.lru_cache(maxsize=AUTO_WIDTH_CACHE_SIZE)
 def auto_width(string, font, width, indent='  '):
-    if font.getlength(string) <= width:
+    """
+    把 string 按 width 折行，续行以 indent 开头。优先在空格或连字符处折行：
+    超宽的字符是空格或连字符时直接在此折行；否则回到已输出文本中最后一个空格或连字符处折行。
+    只扫描一遍：已输出的文本保存为字符列表，并记录其中各空格、连字符的位置，
+    回退折行时不再查找整个字符串；折行后的行宽由字符宽度的前缀和得出。
+    """
+    if measure_text(font, string) <= width:
         return string
 
-    char_widths = [
-        font.getlength(char) for char in string
-    ]
+    char_widths = get_char_widths(font, string)
+    prefix_widths = list(itertools.accumulate(char_widths, initial=0))
     current_width = 0
-    indent_width = font.getlength(indent)
-    processed_string = ''
-
-    for i in range(len(string)):
-        char = string[i]
+    indent_width = measure_text(font, indent)
+    processed = []
+    # processed 中空格与连字符的位置，升序
+    breaks = []
+
+    def append(text):
+        for char in text:
+            if char in ' -':
+                breaks.append(len(processed))
+            processed.append(char)
+
+    for i, char in enumerate(string):
         char_width = char_widths[i]
 
         if char in ' -' and current_width + char_width > width:
-            processed_string += (char if char != ' ' else '') +  '\n' + indent
+            append((char if char != ' ' else '') + '\n' + indent)
             current_width = indent_width
         elif current_width + char_width > width:
-            processed_string_list = list(processed_string)
-            last_space_index = max(processed_string.rfind(' '), processed_string.rfind('-'))
-            last_space_char = processed_string_list[last_space_index]
-            processed_string_list[last_space_index] = (last_space_char if last_space_char != ' ' else '') + '\n' + indent
-            processed_string = ''.join(processed_string_list)
-            processed_string += char
-            current_width = (
-                sum(char_widths[last_space_index+1:i+1])
-                + indent_width
-            )
+            # 没有空格或连字符时与 rfind 的结果 -1 相同，取最后一个字符
+            last_space_index = breaks.pop() if breaks else -1
+            index = last_space_index % len(processed)
+            last_space_char = processed[index]
+            # 替换后位于 index 之后的字符中没有空格或连字符，只需补上替换文本中的
+            tail = processed[index + 1:]
+            del processed[index:]
+            append((last_space_char if last_space_char != ' ' else '') + '\n' + indent)
+            processed += tail
+            append(char)
+            # 与原实现相同，按输出文本中的位置截取字符宽度
+            start = min(last_space_index + 1, i + 1)
+            current_width = prefix_widths[i + 1] - prefix_widths[start] + indent_width
         else:
-            processed_string += char
+            append(char)
             current_width += char_width
-    return processed_string
+    return ''.join(processed)
+
+
+def draw_glyph(draw, xy, text, font, fill, anchor='mm'):
+    # 效果等同于 draw.text(xy, text, font=font, fill=fill, anchor=anchor)，
+    # 启用字形缓存时复用已渲染的遮罩，不再调用 FreeType
+    if glyph_cache is None or font is None:
+        draw.text(xy, text, font=font, fill=fill, anchor=anchor)
+        return
+    mask, offset = glyph_cache.get(font, text, xy, draw.im.size, anchor)
+    if mask.width and mask.height:
+        draw.bitmap(offset, mask, fill=fill)
 
 
 def merge_iterables(*iterables):
@@ -280,12 +605,17 @@ def gap(s):
 
 # 主要函数
 def generate_an_image(_code,
+                     info,
                      group,
                      dimensions,
                      img_properties,
                      info_fonts,
-                     custom_fonts,
+                     fonts,
                      opts):
+    """
+    info 是 unpack_code_info 返回的这个码位的字符信息。
+    fonts 是与 build_font_table 的字体序号对应的 ((字体, 字体名), ...)，默认字体为 (None, 字体名)，用到时才加载。
+    """
     (
         bar_height,
         margin_top,
@@ -319,52 +649,29 @@ def generate_an_image(_code,
     )
     last_type, show_private, show_undefined, show_control, show_reserved = opts['last_type'], opts['show_private'], opts['show_undefined'], opts['show_control'], opts['show_reserved']
 
+    timer = stage_timer
     text = get_char(_code)
-    utf8 = 'UTF-8: ' + gap(to_utf8_hex(_code))
-    utf16le = 'UTF-16LE: ' + gap(to_utf16le_hex(_code))
-    utf16be = 'UTF-16BE: ' + gap(to_utf16be_hex(_code))
+    utf8 = 'UTF-8: ' + info['utf8']
+    utf16le = 'UTF-16LE: ' + info['utf16le']
+    utf16be = 'UTF-16BE: ' + info['utf16be']
 
-    bgc = 20
-    textc = 235
+    bgc = BG_COLOR
+    textc = TEXT_COLOR
     group, intra_group_index = get_group(**group)
     block_infos, _ = group
-    block_cn_name, block_en_name, block_range = block_infos
     
-    plane_index = bisect.bisect_right(PLANE_START_LIST, _code) - 1
-    plane = PLANE_INFOS[plane_index]
-
-    plane_num, plane_en, plane_cn = (
-        f'{plane[0]}({plane[1]})',
-        plane[2],
-        plane[3]
-    )
+    plane_index = info['plane']
+    timer.lap('metadata')
 
     font = None
     font_name = 'unknown'
-    # 自定义字体
-    for _font, font_cmap, _font_name in custom_fonts:
-        if _code in font_cmap:
-            font = _font
-            font_name = _font_name
-            break
-    # 默认字体
-    if (
-        font is None and 
-        (
-            is_defined(_code) and not is_private_use(_code) or
-            show_private and is_private_use(_code) or
-            show_control and is_control(_code) or
-            show_reserved and is_reserved(_code)
-        )
-    ):
-        for font_name_ in FONTS:
-            can_display_chars, font_ = FONTS[font_name_]
-            if _code in can_display_chars:
-                font = font_
-                font_name = font_name_
-                break
+    # 自定义字体与默认字体，见 build_font_table
+    if info['font']:
+        font, font_name = fonts[info['font'] - 1]
+        if font is None:
+            font = get_fallback_font(font_name)
     # 无可用字体，使用最后字体
-    if font is None:
+    else:
         if last_type == 2:
             font = font_mlst
             font_name = font_name_mlst
@@ -373,27 +680,47 @@ def generate_an_image(_code,
             font_name = font_name_last
         else:
             font_name = 'Sarasa-Mono-SC-Regular'
+    timer.lap('font_select')
 
     code = 'U+' + hex(_code)[2:].upper().zfill(4)
-    image = Image.new('L', (w, h), color=bgc)
+
+    mb_text = '\n'.join([utf16be, utf16le, utf8])
+    mb_text_left, _ , mb_text_right, _ = _MEASURE_DRAW.textbbox((w / 2, h - 15), mb_text, font=middle_bottom_font, anchor='md', align='center')
+
+    # 背景、平面信息与区段信息只随平面和区段变化，从缓存的模板复制
+    template, block_line_count = get_frame_template(
+        (w, h),
+        margin_left,
+        margin_right,
+        margin_bottom,
+        plane_index,
+        block_infos,
+        mb_text_left - 15,
+        right_middle_font,
+        left_bottom_font
+    )
+    image = template.copy()
+    timer.lap('template')
 
     draw = ImageDraw.Draw(image)
 
-    mb_text = '\n'.join([utf16be, utf16le, utf8])
-    mb_text_left, _ , mb_text_right, _ = draw.textbbox((w / 2, h - 15), mb_text, font=middle_bottom_font, anchor='md', align='center')
     draw.text((w / 2, h - margin_bottom), mb_text, fill=textc, font=middle_bottom_font, anchor='md', align='center')
+    timer.lap('draw_text:middle_bottom')
 
     fn = auto_width('字体：' + font_name, right_bottom_font, w - mb_text_right - 15)
     rb_text = '\n'.join([fn, code])
+    timer.lap('auto_width')
     draw.text((w - 15, h - margin_bottom), rb_text, font=right_bottom_font, fill=textc, anchor='rd', align='right')
-
-    block_en = auto_width(block_en_name, left_bottom_font, mb_text_left - 15)
-    name = auto_width(get_char_name(_code), left_bottom_font, mb_text_left - 15)
-    lb_text = '\n'.join([name, block_range, block_cn_name, block_en])
+    timer.lap('draw_text:right_bottom')
+
+    # 模板中已有区段信息，用空行占位，使字符名称落在与完整文本相同的位置
+    char_name = get_char_name(_code)
+    timer.lap('metadata')
+    name = auto_width(char_name, left_bottom_font, mb_text_left - 15)
+    lb_text = '\n'.join([name] + [''] * block_line_count)
+    timer.lap('auto_width')
     draw.text((margin_left, h - margin_bottom), lb_text, fill=textc, font=left_bottom_font, anchor='ld')
-
-    rm_text = '\n'.join([plane_cn, plane_en, plane_num])
-    draw.text((w - margin_right, h / 2), rm_text, fill=textc, font=right_middle_font, anchor='rm', align='right')
+    timer.lap('draw_text:left_bottom')
 
     progress = (intra_group_index + 1) / group[1]
     draw.rectangle([0, 0, round(progress * w), bar_height], textc)
@@ -401,70 +728,39 @@ def generate_an_image(_code,
     percent = f'{progress * 100: .2f}%'
     percent_left = draw.textbbox((w - 15, bar_height + 15), percent, font=middle_bottom_font, anchor='rt')[0]
     draw.text((w - margin_right, bar_height + margin_top), percent, font=percent_font, fill=textc, anchor='rt')
-
-    alias = ', '.join(NAMES_LIST.get(
-        str(_code),
-        {'alias': []})['alias']
-    )
-    formal_alias = ', '.join(NAMES_LIST.get(
-        str(_code),
-        {'formal alias': []})['formal alias']
-    )
-    comment = '; '.join(NAMES_LIST.get(
-        str(_code),
-        {'comment': []})['comment']
-    )
-    cross_ref = ', '.join(NAMES_LIST.get(
-        str(_code),
-        {'cross references': []})['cross references']
-    )
-    variation = ', '.join(NAMES_LIST.get(
-        str(_code),
-        {'variation': []})['variation']
-    )
-    decomposition = ' '.join(map(
-        lambda c: 'U+' + c,
-        NAMES_LIST.get(
-            str(_code),
-            {'decomposition': []})['decomposition']
-        )
-    )
-    compat_mapping = ', '.join(NAMES_LIST.get(
-        str(_code),
-        {'compat mapping': []})['compat mapping']
-    )
-    version = '版本：' + get_char_version(_code)
-    alias = auto_width('别名：' + alias, top_font, percent_left - 15) if alias else ''
-    formal_alias = auto_width('正式别名：' + formal_alias, top_font, percent_left - 15) if formal_alias else ''
-    comment = auto_width('说明：' + comment, top_font, percent_left - 15) if comment else ''
-    cross_ref = auto_width('交叉参考：' + cross_ref, top_font, percent_left - 15) if cross_ref else ''
-    variation = auto_width('变体：' + variation, top_font, percent_left - 15) if variation else ''
-    decomposition = auto_width('拆解：' + decomposition, top_font, percent_left - 15) if decomposition else ''
-    compat_mapping = auto_width('兼容性映射：' + compat_mapping, top_font, percent_left - 15) if compat_mapping else ''
-    t_text = '\n'.join(filter(bool, [
-        compat_mapping,
-        decomposition,
-        variation,
-        cross_ref,
-        comment,
-        formal_alias,
-        alias,
-        version
-    ]))
-    draw.text((margin_left, bar_height + margin_top), t_text, font=top_font, fill=textc)
-    show = (is_defined(_code) and not is_private_use(_code)
-            or show_private and font is not None and is_private_use(_code)
-            or show_control and font is not None and is_control(_code)
-            or show_reserved and font is not None and is_reserved(_code)
-            or show_undefined and font is not None and not is_defined(_code))
+    timer.lap('progress_bar')
+
+    wrap_width = percent_left - 15
+    # 有离线折好的信息栏文本（见 info_panel）时直接查表，否则在运行时折行
+    panel_store = get_panel_store(top_font, wrap_width)
+    if panel_store is not None:
+        panel = panel_store.get(_code)
+        timer.lap('metadata')
+    else:
+        panel_lines = get_panel_lines(unicode_data.get_names_entry(_code) or {})
+        timer.lap('metadata')
+        panel = '\n'.join(auto_width(line, top_font, wrap_width) for line in panel_lines)
+        timer.lap('auto_width')
+    version = '版本：' + info['version']
+    t_text = '\n'.join(filter(bool, [panel, version]))
+    if opts.get('panel_cache'):
+        draw_glyph(draw, (margin_left, bar_height + margin_top), t_text, top_font, textc, anchor='la')
+    else:
+        draw.text((margin_left, bar_height + margin_top), t_text, font=top_font, fill=textc)
+    timer.lap('draw_text:top')
+    show = (info['defined'] and not info['private']
+            or show_private and font is not None and info['private']
+            or show_control and font is not None and info['control']
+            or show_reserved and font is not None and info['reserved']
+            or show_undefined and font is not None and not info['defined'])
     if last_type or show:
         if last_type == 1 and not show:
             text = chr(get_char_in_last_resort(_code))
-        elif last_type == 2 and is_control(_code):
+        elif last_type == 2 and info['control']:
             text = chr(_code)
-        draw.text((w / 2, h / 2), text, font=font, fill=textc, anchor='mm')
+        draw_glyph(draw, (w / 2, h / 2), text, font, textc)
     else:
-        if _code in NOT_CHAR:
+        if info['not_char']:
             text = f'非字符 {code}'
         elif 0xD800 <= _code <= 0xDB7F:
             text = f'高位替代字符 {code}'
@@ -472,18 +768,54 @@ def generate_an_image(_code,
             text = f'高位私用替代字符 {code}'
         elif 0xDC00 <= _code <= 0xDFFF:
             text = f'低位替代字符 {code}'
-        elif is_private_use(_code):
+        elif info['private']:
             text = f'私用区字符 {code}'
-        elif is_control(_code):
+        elif info['control']:
             text = f'控制字符 {code}'
-        elif is_reserved(_code):
+        elif info['reserved']:
             text = f'保留字符 {code}'
         else:
             text = f'未定义字符 {code}'
         draw.text((w / 2, h / 2), text, font=cannot_display_default_font, fill=textc, anchor='mm')
+    timer.lap('glyph')
     return image
 
 
+@functools.lru_cache(maxsize=FRAME_TEMPLATE_CACHE_SIZE)
+def get_frame_template(size,
+                       margin_left,
+                       margin_right,
+                       margin_bottom,
+                       plane_index,
+                       block_infos,
+                       lb_width,
+                       right_middle_font,
+                       left_bottom_font):
+    """
+    渲染帧中只随平面和区段变化的部分：背景、右侧的平面信息和左下角的区段信息。
+    返回 (template, block_line_count)，block_line_count 为区段信息所占的行数。
+    """
+    w, h = size
+    block_cn_name, block_en_name, block_range = block_infos
+    plane = PLANE_INFOS[plane_index]
+    plane_num, plane_en, plane_cn = (
+        f'{plane[0]}({plane[1]})',
+        plane[2],
+        plane[3]
+    )
+
+    template = Image.new('L', size, color=BG_COLOR)
+    draw = ImageDraw.Draw(template)
+
+    block_en = auto_width(block_en_name, left_bottom_font, lb_width)
+    block_text = '\n'.join([block_range, block_cn_name, block_en])
+    draw.text((margin_left, h - margin_bottom), block_text, fill=TEXT_COLOR, font=left_bottom_font, anchor='ld')
+
+    rm_text = '\n'.join([plane_cn, plane_en, plane_num])
+    draw.text((w - margin_right, h / 2), rm_text, fill=TEXT_COLOR, font=right_middle_font, anchor='rm', align='right')
+    return template, block_text.count('\n') + 1
+
+
 def generate_unicode_flash(codes,
                            out_path,
                            dimensions,
@@ -491,94 +823,339 @@ def generate_unicode_flash(codes,
                            info_fonts,
                            custom_font_paths,
                            opts):
-    groups = [
-        (
-            (*get_block_infos(k)[:-1], ),
-            len(list(g))
-        ) for k, g in itertools.groupby(codes, get_block)
-    ]
-    group_lens = [l for _, l in groups]
+    groups, group_lens = get_groups(codes)
 
-    custom_fonts = tuple(zip(
-        map(
-            lambda f: ImageFont.truetype(f, EXAMPLE_FONT_SIZE),
-            custom_font_paths
-        ),
-        map(
-            lambda f: get_all_codes_from_font(TTFont(f)),
-            custom_font_paths
-        ),
-        map(
-            lambda f: get_font_name(TTFont(f)),
-            custom_font_paths
-        )
-    ))
-
-    fourcc = cv2.VideoWriter_fourcc(*'mp4v')
-    video_writer = cv2.VideoWriter(
-        out_path,
-        fourcc,
-        video_properties['fps'],
-        (video_properties['width'], video_properties['height'])
-    )
+    custom_fonts = load_custom_fonts(custom_font_paths)
 
-    tasks = []
     img_props = {
         'width': video_properties['width'],
         'height': video_properties['height']
     }
-    for idx, code in enumerate(codes):
-        tasks.append((
-            idx,
-            code,
-            groups,
-            group_lens,
-            dimensions,
-            img_props,
-            info_fonts,
-            custom_fonts,
-            opts
-        ))
 
-    # 用多进程池并行生成帧
-    cpu_cnt = os.cpu_count() or 4
-    with ProcessPoolExecutor(max_workers=cpu_cnt) as exe:
-        # map 会按 tasks 顺序返回结果，chunksize 设小一些也可
-        # exe.map 返回一个 (code_index, bgr_frame) 的迭代器
-        it = exe.map(_worker_generate_frame, tasks, chunksize=8)
-        for code_index, bgr_frame in tqdm(it, total=len(tasks)):
-            video_writer.write(bgr_frame)
+    # 分布式渲染时帧不经过本进程，无法统计
+    local = not video_properties.get('distributed')
+    diff_stats = FrameDiffStats() if video_properties.get('dedup') and local else None
+    profile = FrameProfile() if opts.get('profile') and local else None
+    render_args = (groups, group_lens, dimensions, img_props, info_fonts, custom_fonts, opts)
+    if video_properties.get('segments_dir'):
+        encode_time = generate_segments(
+            codes, out_path, video_properties, custom_font_paths, render_args, diff_stats, profile
+        )
+    else:
+        with tqdm(total=sum(group_lens)) as progress:
+            encode_time = write_video(
+                out_path,
+                video_properties,
+                render_frames(codes, *render_args, profile=profile),
+                progress,
+                diff_stats,
+                profile
+            )
+        if opts.get('glyph_cache'):
+            GlyphCache(opts['glyph_cache']).merge()
+    if diff_stats is not None:
+        print_dedup_report(diff_stats.report(), encode_time, out_path)
+    if profile is not None:
+        profile.finish()
+        profile.write(opts['profile'])
+        print_profile_summary(profile.summary())
+
 
+def write_video(out_path, video_properties, frames, progress, diff_stats=None, profile=None):
+    """
+    把 render_frames 产出的帧编码为 out_path，每写入一帧更新一次 progress；profile 为 FrameProfile 时记录每帧的编码耗时。
+    返回主进程等待编码器（写入帧、结束编码）的时间。
+    """
+    video_writer = open_video_writer(out_path, video_properties)
+    encode_time = 0
+    for code_index, frame in frames:
+        if diff_stats is not None:
+            diff_stats.add(frame)
+        start = time.perf_counter()
+        video_writer.write(frame)
+        elapsed = time.perf_counter() - start
+        encode_time += elapsed
+        if profile is not None:
+            profile.add('encode', elapsed)
+        progress.update()
+
+    start = time.perf_counter()
     video_writer.release()
+    return encode_time + time.perf_counter() - start
 
 
-def _worker_generate_frame(args):
+def generate_segments(codes, out_path, video_properties, custom_font_paths, render_args, diff_stats=None,
+                      profile=None):
     """
-    args 是一个 tuple:
-      (code_index, code, groups, group_lens, dimensions, img_props, info_fonts, custom_fonts, opts)
-    返回 (code_index, bgr_frame)
+    分段渲染：按分组（区段）把帧切成若干段，每段单独编码为段目录下的一个文件，
+    完成后记入清单（见 segments.SegmentManifest）；中断后以相同参数重新运行时跳过已完成的段。
+    全部完成后用 ffmpeg 无损拼接为 out_path，背景音乐在拼接时混入。
+    render_args 为 render_frames 在 codes 之后的参数。返回主进程等待编码器的时间。
     """
-    code_index, code, groups, group_lens, dimensions, img_props, info_fonts, custom_fonts, opts = args
+    groups, group_lens, dimensions, img_props, info_fonts, custom_fonts, opts = render_args
+    segments_dir = video_properties['segments_dir']
+    # 段文件不含音乐，段目录与每段帧数也不影响结果，不计入任务的键
+    segment_props = dict(video_properties, audio_path=None)
+    settings = {
+        'dimensions': dimensions,
+        'video': {k: v for k, v in segment_props.items() if k in VIDEO_JOB_KEYS},
+        'info_fonts': {key: (font.path, font.size) for key, font in info_fonts.items()},
+        'fonts': [os.path.abspath(path) for path in custom_font_paths],
+        'opts': {k: v for k, v in opts.items() if k not in LOCAL_OPTS}
+    }
+    manifest = SegmentManifest(
+        segments_dir,
+        get_job_key(codes, settings),
+        split_segments(group_lens, video_properties.get('segment_frames', SEGMENT_FRAMES))
+    )
+
+    if video_properties.get('distributed'):
+        distribute_segments(
+            codes, manifest, segment_props, dimensions, custom_font_paths, opts, video_properties.get('local_workers', 0)
+        )
+        concat_segments(
+            [manifest.segment_path(segment) for segment in manifest.segments],
+            out_path,
+            video_properties.get('audio_path')
+        )
+        return 0
+
+    encode_time = 0
+    with tqdm(total=sum(group_lens), initial=manifest.done_frames()) as progress:
+        for segment in manifest.pending():
+            start, stop = segment['start'], segment['stop']
+            path = manifest.segment_path(segment)
+            # 先写入临时文件，完整编码后才改名并记入清单，中断时不会留下看似完成的段
+            part_path = path[:-len('.mp4')] + '.part.mp4'
+            encode_time += write_video(
+                part_path,
+                segment_props,
+                render_frames(codes[start:stop], *render_args, start_index=start, profile=profile),
+                progress,
+                diff_stats,
+                profile
+            )
+            os.replace(part_path, path)
+            manifest.mark_done(segment)
+            if opts.get('glyph_cache'):
+                GlyphCache(opts['glyph_cache']).merge()
+
+    concat_segments(
+        [manifest.segment_path(segment) for segment in manifest.segments],
+        out_path,
+        video_properties.get('audio_path')
+    )
+    return encode_time
+
+
+def distribute_segments(codes, manifest, video_properties, dimensions, custom_font_paths, opts, local_workers=0):
+    """
+    协调进程：把未完成的段作为任务发布到段目录（见 work_queue.SegmentQueue），
+    等待工作进程（render_worker.py，可运行在能访问段目录的其他机器上）完成全部段。
+    local_workers 为在本机启动的工作进程数，均分本机的 CPU 核数；为 0 时只等待其他机器上的工作进程。
+    """
+    queue = SegmentQueue(manifest.segments_dir)
+    queue.write_job({
+        'codes': codes.bounds if isinstance(codes, CodeRanges) else list(codes),
+        'ranges': isinstance(codes, CodeRanges),
+        'segments': manifest.pending(),
+        'dimensions': dimensions,
+        'video_properties': video_properties,
+        'fonts': [os.path.abspath(path) for path in custom_font_paths],
+        'opts': {k: v for k, v in opts.items() if k not in LOCAL_OPTS}
+    })
+
+    command = [
+        sys.executable, RENDER_WORKER_PATH, manifest.segments_dir,
+        '-w', str(max(1, (os.cpu_count() or 1) // max(local_workers, 1))), '-nm', '-q'
+    ]
+    if opts.get('glyph_cache'):
+        command += ['-gc', opts['glyph_cache']]
+    if opts.get('panel_cache'):
+        command.append('-pc')
+    processes = [subprocess.Popen(command, stdout=subprocess.DEVNULL) for _ in range(local_workers)]
+
+    try:
+        with tqdm(total=manifest.segments[-1]['stop'], initial=manifest.done_frames()) as progress:
+            while pending := manifest.pending():
+                for segment in pending:
+                    if queue.is_done(segment):
+                        manifest.mark_done(segment)
+                        progress.update(segment['stop'] - segment['start'])
+                failed = [process.returncode for process in processes if process.poll()]
+                if failed:
+                    raise RuntimeError(f'本机的工作进程异常退出，返回值为 {failed[0]}。')
+                if manifest.pending():
+                    time.sleep(POLL_INTERVAL)
+    finally:
+        for process in processes:
+            if process.poll() is None and manifest.pending():
+                process.terminate()
+            process.wait()
+
+    # 本机的工作进程共用同一个缓存目录，在它们全部结束后统一合并
+    if local_workers and opts.get('glyph_cache'):
+        GlyphCache(opts['glyph_cache']).merge()
+
+
+def print_dedup_report(report, encode_time, out_path):
+    frames = report['frames']
+    print(f'共 {frames} 帧：')
+    print(f'  与上一帧相同：{report["identical"]}')
+    print(f'  局部更新：{report["partial"]}')
+    print(f'  完整更新：{report["full"]}')
+    print(f'  平均每帧变化的块：{report["mean_changed_blocks"] * 100:.2f}%')
+    print(f'编码耗时：{encode_time:.1f} 秒（{frames / encode_time if encode_time else 0:.1f} 帧/秒）')
+    print(f'文件大小：{os.path.getsize(out_path) / 2 ** 20:.2f} MiB')
+
+
+def report_codes(codes, custom_font_paths, opts):
+    """统计将要快闪的字符：各类字符、各平面和各字体的字符数。"""
+    custom_fonts = load_custom_fonts(custom_font_paths)
+    font_table = build_font_table(custom_fonts, opts)
+    font_names = [name for _, _, name in custom_fonts] + list(unicode_data.get_font_names())
+    kinds = {'defined': '定义字符', 'private': '私用区字符', 'control': '控制字符', 'reserved': '保留字符', 'not_char': '非字符'}
+
+    total = 0
+    kind_counts = dict.fromkeys(kinds, 0)
+    plane_counts = np.zeros(len(PLANE_INFOS), dtype=np.int64)
+    font_counts = np.zeros(len(font_names) + 1, dtype=np.int64)
+    codes = iter(codes)
+    while chunk := list(itertools.islice(codes, CODE_INFO_CHUNK_SIZE)):
+        infos = get_code_infos(chunk, font_table, columns=('plane', 'font', *kinds))
+        total += len(chunk)
+        for kind in kinds:
+            kind_counts[kind] += int(infos[kind].sum())
+        plane_counts += np.bincount(infos['plane'], minlength=len(plane_counts))
+        font_counts += np.bincount(infos['font'], minlength=len(font_counts))
+
+    print(f'共 {total} 个字符')
+    for kind, label in kinds.items():
+        print(f'  {label}：{kind_counts[kind]}')
+    print(f'  未定义字符：{total - kind_counts["defined"]}')
+    print('各平面：')
+    for plane, count in zip(PLANE_INFOS, plane_counts):
+        if count:
+            print(f'  {plane[0]} {plane[3]}：{count}')
+    print('各字体：')
+    for name, count in zip(font_names + ['（无可用字体）'], [*font_counts[1:], font_counts[0]]):
+        if count:
+            print(f'  {name}：{count}')
+
+
+def render_frames(codes,
+                  groups,
+                  group_lens,
+                  dimensions,
+                  img_props,
+                  info_fonts,
+                  custom_fonts,
+                  opts,
+                  workers=None,
+                  start_index=0,
+                  profile=None):
+    """
+    用多进程池并行生成帧，按 codes 的顺序逐个产出 (code_index, frame)。
+    codes 可以是整个序列中从第 start_index 个开始的一段，code_index 与 groups 均按整个序列计。
+    profile 为 FrameProfile 时记录每帧各阶段的耗时（需要 opts['profile'] 使工作进程计时）。
+    frame 是单通道灰度帧，为共享内存帧槽的视图，只在下一次迭代前有效。
+    """
+    workers = workers or os.cpu_count() or 4
+    slot_count = workers * FRAME_SLOTS_PER_WORKER
+    frame_shape = (img_props['height'], img_props['width'])
+    font_table = build_font_table(custom_fonts, opts)
+    with (
+        FrameRing(slot_count, frame_shape) as ring,
+        ProcessPoolExecutor(
+            max_workers=workers,
+            initializer=_init_worker,
+            initargs=(ring.spec, groups, group_lens, dimensions, img_props, info_fonts, custom_fonts, opts)
+        ) as exe
+    ):
+        # 每个任务只含 (code_index, code, slot, record)，其余上下文由 _init_worker 在每个工作进程中加载一次；
+        # 字符信息在主进程中按块批量计算并打包为定长记录，由工作进程转为 dict
+        tasks = (
+            (idx, code, idx % slot_count, record)
+            for idx, (code, record) in enumerate(iter_code_infos(codes, font_table), start_index)
+        )
+        pending = deque(
+            exe.submit(_worker_generate_frame, task)
+            for task in itertools.islice(tasks, slot_count)
+        )
+        while pending:
+            start = time.perf_counter()
+            code_index, slot, timings = pending.popleft().result()
+            if profile is not None:
+                profile.add_frame(code_index, timings)
+                profile.add('ipc_wait', time.perf_counter() - start)
+            yield code_index, ring.frames[slot]
+            # 这个槽的帧已被消费，才能提交下一个（会复用这个槽的）任务
+            start = time.perf_counter()
+            for task in itertools.islice(tasks, 1):
+                pending.append(exe.submit(_worker_generate_frame, task))
+            if profile is not None:
+                profile.add('dispatch', time.perf_counter() - start)
+
+
+# 工作进程的上下文，由 _init_worker 在进程启动时设置一次
+_WORKER_CONTEXT = {}
+
+
+def _init_worker(ring_spec, groups, group_lens, dimensions, img_props, info_fonts, custom_fonts, opts):
+    """
+    进程池的 initializer，每个工作进程只执行一次。
+    ring_spec 是 FrameRing.spec，custom_fonts 是 load_custom_fonts 的返回值：((path, cmap, name), ...)
+    """
+    load_last_fonts(opts['last_type'])
+    load_glyph_cache(opts.get('glyph_cache'))
+    load_stage_timer(opts.get('profile'))
+    _WORKER_CONTEXT.update(
+        ring=FrameRing.attach(ring_spec),
+        groups=groups,
+        group_ends=get_group_ends(group_lens),
+        dimensions=dimensions,
+        img_props=img_props,
+        info_fonts=info_fonts,
+        fonts=(
+            *((ImageFont.truetype(path, EXAMPLE_FONT_SIZE), name) for path, _, name in custom_fonts),
+            *((None, name) for name in unicode_data.get_font_names())
+        ),
+        opts=opts
+    )
+
+
+def _worker_generate_frame(task):
+    """
+    task 是一个 tuple: (code_index, code, slot, record)，record 见 pack_code_infos
+    帧写入共享内存帧环的 slot 号槽中，返回 (code_index, slot, timings)，
+    timings 为 StageTimer.result() 的逐阶段耗时，未启用性能分析时为 None
+    """
+    stage_timer.start()
+    code_index, code, slot, record = task
+    info = unpack_code_info(record)
+    ctx = _WORKER_CONTEXT
 
     # 复用已有逻辑：构造传给 generate_an_image 的 group dict
     group_dict = {
-        'groups': groups,
-        'group_lens': group_lens,
+        'groups': ctx['groups'],
+        'group_ends': ctx['group_ends'],
         'code_index': code_index
     }
 
     pil_img = generate_an_image(
         code,
+        info,
         group_dict,
-        dimensions,
-        img_props,
-        info_fonts,
-        custom_fonts,
-        opts
+        ctx['dimensions'],
+        ctx['img_props'],
+        ctx['info_fonts'],
+        ctx['fonts'],
+        ctx['opts']
     )
-    # 转为 OpenCV BGR
-    bgr = cv2.cvtColor(np.array(pil_img), cv2.COLOR_GRAY2BGR)
-    return code_index, bgr
+    # 'L' 模式的图像直接按单通道灰度写入帧槽，不再转换为 BGR
+    np.copyto(ctx['ring'].frames[slot], np.asarray(pil_img))
+    stage_timer.lap('frame_copy')
+    return code_index, slot, stage_timer.result()
 
 
 if __name__ == '__main__':
@@ -625,7 +1202,45 @@ if __name__ == '__main__':
                         help='左边距，默认 30。')
     parser.add_argument('-mr', '--margin_right', type=int, default=30,
                         help='右边距，默认 30。')
-
+    parser.add_argument('-gc', '--glyph_cache', type=str, nargs='?',
+                        const=os.path.join(CUR_FOLDER, '.cache', 'glyphs'),
+                        help='启用字形位图缓存，可指定缓存目录，默认为当前路径下的 .cache/glyphs。')
+    parser.add_argument('-pc', '--panel_cache', action='store_true',
+                        help='把左上角信息栏的位图也存入字形位图缓存（与 -gc 一起使用），'
+                             '以相同的分辨率与边距重新生成时不再重复光栅化。每个字符一条，缓存会比较大。')
+    parser.add_argument('-enc', '--encoder', choices=ENCODERS, default='opencv',
+                        help='视频编码器：opencv（mp4v，默认）或 ffmpeg（需要安装 ffmpeg，帧通过管道直接交给 ffmpeg 编码）。')
+    parser.add_argument('-vc', '--video_codec', choices=FFMPEG_CODECS, default='libx264',
+                        help='ffmpeg 编码器使用的视频编码，默认 libx264。')
+    parser.add_argument('-pre', '--preset', choices=FFMPEG_PRESETS, default='medium',
+                        help='ffmpeg 编码器的预设，越慢压缩率越高，默认 medium。')
+    parser.add_argument('-crf', '--crf', type=int,
+                        help='ffmpeg 编码器的 CRF（质量，越小质量越高），默认使用编码的默认值（libx264 为 23，libx265 为 28）。')
+    parser.add_argument('-th', '--threads', type=int, default=0,
+                        help='ffmpeg 编码器的线程数，默认 0（自动）。')
+    parser.add_argument('-dd', '--dedup', action='store_true',
+                        help='统计与上一帧相同或只有局部变化的帧并在结束时报告，只用于分析，不改变输出的视频。')
+    parser.add_argument('-au', '--audio', type=str, nargs='?',
+                        const=os.path.join(CUR_FOLDER, 'UFM.mp3'),
+                        help='在编码的同时混入背景音乐（仅限 ffmpeg 编码器或分段渲染），可指定音乐文件，默认为当前路径下的 UFM.mp3。')
+    parser.add_argument('-prof', '--profile', type=str, nargs='?',
+                        const=os.path.join(CUR_FOLDER, 'profile.json'),
+                        help='逐帧记录各阶段（字符信息、选择字体、auto_width、各处文本、字形、写入帧槽、进程间通信、编码等）的耗时，'
+                             '结束时打印汇总表并写出报告：路径以 .csv 结尾时为逐帧的耗时，否则为 JSON 格式的汇总，'
+                             '默认为当前路径下的 profile.json。')
+    parser.add_argument('-seg', '--segments', type=str, nargs='?', const='',
+                        help='分段渲染（需要安装 ffmpeg）：每个区段单独编码为段目录下的一个文件，中断后以相同参数重新运行会跳过已完成的段，'
+                             '全部完成后无损拼接为输出视频。可指定段目录，默认为输出路径加上 .segments。')
+    parser.add_argument('-dist', '--distributed', action='store_true',
+                        help='分布式渲染（与 -seg 一起使用）：本进程只把各段作为任务发布到段目录并等待完成，'
+                             '由能访问段目录的机器上运行的 render_worker.py 认领、渲染各段。')
+    parser.add_argument('-lw', '--local_workers', type=int, default=0,
+                        help='分布式渲染时在本机启动的工作进程数，默认 0（只等待其他机器上的工作进程）。')
+    parser.add_argument('-sf', '--segment_frames', type=int, default=SEGMENT_FRAMES,
+                        help=f'分段渲染时每段的最大帧数，更长的区段会再切成多段，默认 {SEGMENT_FRAMES}。')
+
+    parser.add_argument('-rp', '--report', action='store_true',
+                        help='只统计将要快闪的字符（各类字符、各平面和各字体的字符数），不生成视频。')
     undef_group = parser.add_mutually_exclusive_group()
     undef_group.add_argument('-su', '--skip_undefined', action='store_true',
                              help='跳过未定义字符、非字符、代理字符等。')
@@ -653,38 +1268,19 @@ if __name__ == '__main__':
     chars_group.add_argument('-ff', '--from_font', action='store_true',
                              help='从字体文件列表获取将要快闪的字符。')
     args = parser.parse_args()
-
-    # 要用到的字体
-    top_font_path = os.path.join(CUR_FOLDER, 'Sarasa-Mono-SC-Regular.ttf')
-    right_middle_font_path = os.path.join(CUR_FOLDER, 'Sarasa-Mono-SC-Regular.ttf')
-    left_bottom_font_path = os.path.join(CUR_FOLDER, 'Sarasa-Mono-SC-Regular.ttf')
-    middle_bottom_font_path = os.path.join(CUR_FOLDER, 'Sarasa-Mono-SC-Regular.ttf')
-    right_bottom_font_path = os.path.join(CUR_FOLDER, 'Sarasa-Mono-SC-Regular.ttf')
-    cannot_display_default_font_path = os.path.join(CUR_FOLDER, 'Sarasa-Mono-SC-Regular.ttf')
-    percent_font_path = os.path.join(CUR_FOLDER, 'Sarasa-Mono-SC-Regular.ttf')
-
-    t_font = ImageFont.truetype(top_font_path, 12)
-    rm_font = ImageFont.truetype(right_middle_font_path, 25)
-    lb_font = ImageFont.truetype(left_bottom_font_path, 25)
-    rb_font = ImageFont.truetype(right_bottom_font_path, 40)
-    mb_font = ImageFont.truetype(middle_bottom_font_path, 20)
-    cdd_font = ImageFont.truetype(cannot_display_default_font_path, 40)
-    p_font = ImageFont.truetype(percent_font_path, 20)
-
-    font_path_mlst = os.path.join(CUR_FOLDER, 'Monu-Last.ttf')
-    font_path_last = os.path.join(CUR_FOLDER, 'LastResort-PUA.ttf')
-    tfont_mlst = TTFont(font_path_mlst)
-    tfont_last = TTFont(font_path_last)
-    font_mlst = ImageFont.truetype(font_path_mlst, EXAMPLE_FONT_SIZE)
-    font_last = ImageFont.truetype(font_path_last, EXAMPLE_FONT_SIZE)
-    font_name_mlst = 'Monu-Last'
-    font_name_last = 'LastResort-Regular'
+    # 分段渲染时音乐在拼接各段时混入，与编码器无关
+    if args.audio and args.encoder != 'ffmpeg' and args.segments is None:
+        parser.error('-au/--audio 需要与 -enc ffmpeg 或 -seg 一起使用。')
+    if args.panel_cache and not args.glyph_cache:
+        parser.error('-pc/--panel_cache 需要与 -gc 一起使用。')
+    if args.distributed and args.segments is None:
+        parser.error('-dist/--distributed 需要与 -seg 一起使用。')
 
     codes = []
     if args.rang:
-        codes = list(range(
+        codes = CodeRanges.from_range(
             args.rang[0], args.rang[1] + 1
-        ))
+        )
     elif args.from_code_file:
         codes = list(map(
             lambda v: int(v, 16) if UNICODE_RE.search(v) else _ve(v),
@@ -694,59 +1290,67 @@ if __name__ == '__main__':
         codes = list(map(lambda char: ord(char), args.from_text_file.read()))
     elif args.from_font:
         codes = sorted(merge_iterables(
-            *(get_all_codes_from_font(TTFont(font)) for font in args.fonts)
+            *(get_all_codes_from_font(font).tolist() for font in args.fonts)
         ))
 
     skip_long = args.skip_long
     skip_undefined = args.skip_undefined
     skip_no_glyph = args.skip_no_glyph
-    if skip_long or skip_undefined:
-        codes = list(filter(
-            lambda code: not (
-                skip_long and 0x3347A <= code <= 0xDFFFF
-                or skip_undefined and not is_defined(code)
-            ), codes
-        ))
+    # 要保留的码位，以区间集合表示；-r 给出的范围直接与之求交，不展开成列表
+    keep = CodeRanges.from_range(0, 0x110000)
+    if skip_long:
+        keep -= CodeRanges.from_range(0x3347A, 0xE0000)
+    if skip_undefined:
+        keep &= get_defined_ranges()
     if skip_no_glyph:
-        all_glyphs = set(merge_iterables(*map(
-            lambda f: get_all_codes_from_font(TTFont(f)),
+        keep &= CodeRanges.from_codes(merge_iterables(*map(
+            lambda f: get_all_codes_from_font(f).tolist(),
             args.fonts
         )))
 
-        codes = list(filter(
-            lambda c: c in all_glyphs, codes
-        ))
-
-    generate_unicode_flash(
-        codes,
-        args.out_path,
-        {
-           'bar_height': args.bar_height,
-           'margin_top': args.margin_top,
-           'margin_bottom': args.margin_bottom,
-           'margin_left': args.margin_left,
-           'margin_right': args.margin_right,
-        },
-        {
-           'width': args.width,
-           'height': args.height,
-           'fps': args.fps
-        },
-        {
-          'top': t_font,
-          'right_middle': rm_font,
-          'left_bottom': lb_font,
-          'middle_bottom': mb_font,
-          'right_bottom': rb_font,
-          'cannot_display_default': cdd_font,
-          'percent': p_font
-        },
-        args.fonts,
-        {
-           'last_type': 1 if args.use_last else 2 if args.use_mlst else 0,
-           'show_private': args.show_private,
-           'show_undefined': args.show_undefined,
-           'show_control': args.show_control,
-           'show_reserved': args.show_reserved
-        }
-    )
+    if skip_long or skip_undefined or skip_no_glyph:
+        codes = codes & keep if isinstance(codes, CodeRanges) else keep.filter(codes)
+
+    opts = {
+       'last_type': 1 if args.use_last else 2 if args.use_mlst else 0,
+       'show_private': args.show_private,
+       'show_undefined': args.show_undefined,
+       'show_control': args.show_control,
+       'show_reserved': args.show_reserved,
+       'glyph_cache': args.glyph_cache,
+       'panel_cache': args.panel_cache,
+       'profile': args.profile
+    }
+    if args.report:
+        report_codes(codes, args.fonts, opts)
+    else:
+        generate_unicode_flash(
+            codes,
+            args.out_path,
+            {
+               'bar_height': args.bar_height,
+               'margin_top': args.margin_top,
+               'margin_bottom': args.margin_bottom,
+               'margin_left': args.margin_left,
+               'margin_right': args.margin_right,
+            },
+            {
+               'width': args.width,
+               'height': args.height,
+               'fps': args.fps,
+               'encoder': args.encoder,
+               'codec': args.video_codec,
+               'preset': args.preset,
+               'crf': args.crf,
+               'threads': args.threads,
+               'audio_path': args.audio,
+               'dedup': args.dedup,
+               'segments_dir': args.out_path + '.segments' if args.segments == '' else args.segments,
+               'segment_frames': args.segment_frames,
+               'distributed': args.distributed,
+               'local_workers': args.local_workers
+            },
+            load_info_fonts(),
+            args.fonts,
+            opts
+        )
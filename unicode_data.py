@@ -0,0 +1,271 @@
+"""
+ToolFiles 中 Unicode 数据的编译格式与惰性读取。
+
+.mp.zlib 文件要整体解压、解包成 Python 对象后才能使用，导入时要花上秒级的时间，
+而且每个工作进程都要再来一次。这里把它们编译成 ToolFiles/compiled/ 下可直接 mmap 的文件：
+  names_table.bin     NamesList 的列式数组（见 names_table）与按码位直接取行号的 rows 数组，逐个拼接，位置记录在 meta.mp['names_layout']；
+                      字符串数据按 mmap 的分配粒度对齐，各自 mmap，切片直接得到 bytes；
+  defined.npy         DefinedCharacterList 的位图（见 CodeBitmap），uint8；
+  reserved.npy        NamesList 中名称为 <reserved-...> 的码位的位图；
+  versions.npy        每个码位的版本在 meta.mp['versions'] 中的序号加一（0 表示未分配），uint8；
+  fallback.npy        每个码位的默认字体在 meta.mp['fonts'] 中的序号加一（0 表示无），uint8；
+  meta.mp             版本、字体名称表与 CommonNames 区间，最后写入，兼作编译完成的标记。
+查找时只解码用到的那几个字符串。源文件比编译结果新时会自动重新编译。
+"""
+import numpy as np
+import msgpack
+
+import os
+import zlib
+import mmap
+import functools
+
+from names_table import NamesTable
+
+CUR_FOLDER = os.path.dirname(__file__)
+TOOL_FILES_FOLDER = os.path.join(CUR_FOLDER, 'ToolFiles')
+COMPILED_FOLDER = os.path.join(TOOL_FILES_FOLDER, 'compiled')
+SOURCE_NAMES = ('DefinedCharacterList', 'NamesList', 'Versions', 'CommonNames', 'FontFallback')
+SOURCE_PATHS = {
+    name: os.path.join(TOOL_FILES_FOLDER, name + '.mp.zlib')
+    for name in SOURCE_NAMES
+}
+META_PATH = os.path.join(COMPILED_FOLDER, 'meta.mp')
+COMPILED_NAMES = (
+    'names_table.bin', 'defined.npy', 'reserved.npy', 'versions.npy', 'fallback.npy', 'meta.mp'
+)
+CODESPACE_SIZE = 0x110000
+
+
+def _load_source(name, **kwargs):
+    with open(SOURCE_PATHS[name], 'rb') as f:
+        return msgpack.unpackb(zlib.decompress(f.read()), strict_map_key=False, **kwargs)
+
+
+def _save_array(name, array):
+    path = os.path.join(COMPILED_FOLDER, name)
+    np.save(path + '.tmp.npy', array)
+    os.replace(path + '.tmp.npy', path)
+
+
+def is_compiled_stale():
+    if not all(os.path.exists(os.path.join(COMPILED_FOLDER, name)) for name in COMPILED_NAMES):
+        return True
+    compiled_mtime = os.path.getmtime(META_PATH)
+    return any(os.path.getmtime(path) > compiled_mtime for path in SOURCE_PATHS.values())
+
+
+def compile_data():
+    os.makedirs(COMPILED_FOLDER, exist_ok=True)
+    if os.path.exists(META_PATH):
+        os.remove(META_PATH)
+
+    with open(SOURCE_PATHS['NamesList'], 'rb') as f:
+        names = NamesTable.unpack(zlib.decompress(f.read()))
+    names_layout = []
+    table_path = os.path.join(COMPILED_FOLDER, 'names_table.bin')
+    with open(table_path + '.tmp', 'wb') as f:
+        for array_name, array in (*names.arrays.items(), ('rows', names.build_rows(CODESPACE_SIZE))):
+            if array_name.endswith('.data'):
+                f.write(b'\0' * (-f.tell() % mmap.ALLOCATIONGRANULARITY))
+                data = bytes(array)
+            else:
+                f.write(b'\0' * (-f.tell() % 4))
+                data = np.asarray(array, dtype='<u4').tobytes()
+            names_layout.append((array_name, f.tell(), len(data)))
+            f.write(data)
+    os.replace(table_path + '.tmp', table_path)
+    _save_array('reserved.npy', CodeBitmap.from_codes(
+        code for code in names.codes
+        if names.get_name(code).startswith('<reserved')
+    ).bits)
+
+    _save_array('defined.npy', CodeBitmap.from_codes(_load_source('DefinedCharacterList')).bits)
+
+    versions = _load_source('Versions', use_list=False)
+    version_names = sorted(set(versions['range'].values()) | set(versions['single'].values()))
+    version_table = np.zeros(CODESPACE_SIZE, dtype=np.uint8)
+    # 单个码位的版本优先于区间
+    for (start, end), version in versions['range'].items():
+        version_table[start:end + 1] = version_names.index(version) + 1
+    for code, version in versions['single'].items():
+        version_table[code] = version_names.index(version) + 1
+    _save_array('versions.npy', version_table)
+
+    font_fallback = _load_source('FontFallback')
+    font_names = list(font_fallback)
+    fallback_table = np.zeros(CODESPACE_SIZE, dtype=np.uint8)
+    # 先写优先级低的字体，使优先级高的字体覆盖它们
+    for i in reversed(range(len(font_names))):
+        fallback_table[np.array(font_fallback[font_names[i]], dtype=np.int64)] = i + 1
+    _save_array('fallback.npy', fallback_table)
+
+    common_names = _load_source('CommonNames', use_list=False)
+    meta = {
+        'versions': version_names,
+        'fonts': font_names,
+        'common_names': [(start, end, name) for (start, end), name in sorted(common_names.items())],
+        'names_layout': names_layout
+    }
+    with open(META_PATH + '.tmp', 'wb') as f:
+        f.write(msgpack.packb(meta))
+    os.replace(META_PATH + '.tmp', META_PATH)
+
+
+class CodeBitmap:
+    """
+    覆盖全部 0x110000 个码位的位图，每个码位占一位（共 136 KiB），
+    用来代替存放大量 int 的 set 做成员判断。位按 little 顺序打包：码位 c 在第 c >> 3 字节的第 c & 7 位。
+    """
+
+    def __init__(self, bits):
+        self.bits = bits
+        self._view = memoryview(bits).cast('B')
+
+    @classmethod
+    def from_bools(cls, flags):
+        return cls(np.packbits(flags, bitorder='little'))
+
+    @classmethod
+    def from_codes(cls, codes):
+        flags = np.zeros(CODESPACE_SIZE, dtype=bool)
+        flags[np.fromiter(codes, dtype=np.int64)] = True
+        return cls.from_bools(flags)
+
+    @classmethod
+    def from_ranges(cls, ranges):
+        # ranges 为闭区间 ((start, end), ...)
+        flags = np.zeros(CODESPACE_SIZE, dtype=bool)
+        for start, end in ranges:
+            flags[start:end + 1] = True
+        return cls.from_bools(flags)
+
+    def to_bools(self):
+        return np.unpackbits(self.bits, bitorder='little').astype(bool)
+
+    def __contains__(self, code):
+        return 0 <= code < CODESPACE_SIZE and self._view[code >> 3] >> (code & 7) & 1 == 1
+
+    def contains(self, codes):
+        """批量的成员判断：codes 为码位数组，返回同样形状的布尔数组。"""
+        codes = np.asarray(codes, dtype=np.int64)
+        valid = (codes >= 0) & (codes < CODESPACE_SIZE)
+        codes = np.where(valid, codes, 0)
+        return valid & (self.bits[codes >> 3] >> (codes & 7) & 1 == 1)
+
+    def __len__(self):
+        return int(np.unpackbits(self.bits).sum())
+
+    def __or__(self, other):
+        return CodeBitmap(self.bits | other.bits)
+
+    def __and__(self, other):
+        return CodeBitmap(self.bits & other.bits)
+
+    def __sub__(self, other):
+        return CodeBitmap(self.bits & ~other.bits)
+
+    def __invert__(self):
+        return CodeBitmap(~self.bits)
+
+
+class UnicodeData:
+    def __init__(self):
+        with open(META_PATH, 'rb') as f:
+            meta = msgpack.unpackb(f.read(), use_list=False)
+        self.version_names = meta['versions']
+        self.font_names = meta['fonts']
+        self.common_names = meta['common_names']
+
+        def load(name):
+            # 以 memoryview 访问 mmap 的数组：按单个码位查找时比 numpy 的标量索引快得多
+            array = np.load(os.path.join(COMPILED_FOLDER, name), mmap_mode='r')
+            return memoryview(array).cast('B').cast(array.dtype.char)
+
+        names_arrays = {}
+        with open(os.path.join(COMPILED_FOLDER, 'names_table.bin'), 'rb') as f:
+            names_buffer = memoryview(mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ))
+            for array_name, offset, size in meta['names_layout']:
+                if not array_name.endswith('.data'):
+                    names_arrays[array_name] = np.frombuffer(names_buffer[offset:offset + size], dtype='<u4')
+                elif size:
+                    names_arrays[array_name] = mmap.mmap(f.fileno(), size, access=mmap.ACCESS_READ, offset=offset)
+                else:
+                    names_arrays[array_name] = b''
+        self.names = NamesTable(names_arrays, names_arrays.pop('rows'))
+        self.defined = CodeBitmap(np.load(os.path.join(COMPILED_FOLDER, 'defined.npy'), mmap_mode='r'))
+        self.reserved = CodeBitmap(np.load(os.path.join(COMPILED_FOLDER, 'reserved.npy'), mmap_mode='r'))
+        self.versions = load('versions.npy')
+        self.fallback = load('fallback.npy')
+
+
+@functools.cache
+def get_data():
+    if is_compiled_stale():
+        compile_data()
+    return UnicodeData()
+
+
+def get_names_entry(code):
+    """返回 NamesList 中 code 的条目（dict，省略了空字段），没有则返回 None。"""
+    return get_data().names.get_entry(code)
+
+
+def get_name(code):
+    """返回 NamesList 中 code 的名称（可能为空字符串），没有条目时返回 None。只解码名称这一个字符串。"""
+    return get_data().names.get_name(code)
+
+
+def get_defined_list():
+    """DefinedCharacterList 的位图（CodeBitmap）。"""
+    return get_data().defined
+
+
+def in_defined_list(code):
+    return code in get_data().defined
+
+
+def get_reserved_list():
+    """NamesList 中名称为 <reserved-...> 的码位的位图（CodeBitmap）。"""
+    return get_data().reserved
+
+
+def get_version_table():
+    """
+    每个码位的版本序号加一（0 表示未分配），长度为 0x110000 的 uint8 数组（只读）。
+    序号对应 get_version_names() 中的版本。
+    """
+    return np.frombuffer(get_data().versions, dtype=np.uint8)
+
+
+def get_version_names():
+    return get_data().version_names
+
+
+def get_version(code):
+    data = get_data()
+    index = data.versions[code]
+    return data.version_names[index - 1] if index else None
+
+
+def get_fallback_font_name(code):
+    data = get_data()
+    index = data.fallback[code]
+    return data.font_names[index - 1] if index else None
+
+
+def get_fallback_table():
+    """
+    每个码位的默认字体序号加一（0 表示无），长度为 0x110000 的 uint8 数组（只读）。
+    序号对应 get_font_names() 中的字体。
+    """
+    return np.frombuffer(get_data().fallback, dtype=np.uint8)
+
+
+def get_font_names():
+    return get_data().font_names
+
+
+def get_common_names():
+    """CommonNames 中的区间，按起点排序：((start, end, name), ...)"""
+    return get_data().common_names
@@ -0,0 +1,71 @@
+import cv2
+
+import subprocess
+
+ENCODERS = ('opencv', 'ffmpeg')
+FFMPEG_CODECS = ('libx264', 'libx265')
+FFMPEG_PRESETS = (
+    'ultrafast', 'superfast', 'veryfast', 'faster', 'fast',
+    'medium', 'slow', 'slower', 'veryslow', 'placebo'
+)
+
+
+class FFmpegWriter:
+    """
+    把单通道灰度帧通过 stdin 以原始视频流交给 ffmpeg 子进程编码，接口与 cv2.VideoWriter 相同（write / release）。
+    给出 audio_path 时在同一次编码中循环混入背景音乐，并截断到与视频等长，不再需要 add_audio.py。
+    """
+
+    def __init__(self, out_path, fps, size, codec='libx264', preset='medium', crf=None, threads=0, audio_path=None):
+        width, height = size
+        command = [
+            'ffmpeg', '-hide_banner', '-loglevel', 'error', '-y',
+            '-f', 'rawvideo', '-pix_fmt', 'gray', '-s', f'{width}x{height}', '-r', str(fps),
+            '-i', '-'
+        ]
+        if audio_path:
+            command += ['-stream_loop', '-1', '-i', audio_path, '-map', '0:v', '-map', '1:a', '-c:a', 'copy', '-shortest']
+        command += ['-c:v', codec, '-preset', preset, '-pix_fmt', 'yuv420p', '-threads', str(threads)]
+        if crf is not None:
+            command += ['-crf', str(crf)]
+        if codec == 'libx265':
+            # 让 QuickTime 等播放器也能识别 HEVC
+            command += ['-tag:v', 'hvc1', '-x265-params', 'log-level=error']
+        command.append(out_path)
+        self.process = subprocess.Popen(command, stdin=subprocess.PIPE)
+
+    def write(self, frame):
+        try:
+            self.process.stdin.write(frame.tobytes())
+        except BrokenPipeError:
+            raise RuntimeError(f'ffmpeg 意外退出，返回值为 {self.process.wait()}。') from None
+
+    def release(self):
+        self.process.stdin.close()
+        if self.process.wait():
+            raise RuntimeError(f'ffmpeg 编码失败，返回值为 {self.process.returncode}。')
+
+
+def open_video_writer(out_path, video_properties):
+    """
+    按 video_properties['encoder'] 打开视频写入器：
+      opencv   cv2.VideoWriter，mp4v 编码（默认）；
+      ffmpeg   FFmpegWriter，使用 video_properties 中的 codec、preset、crf、threads 与 audio_path。
+    """
+    size = (video_properties['width'], video_properties['height'])
+    encoder = video_properties.get('encoder', 'opencv')
+    if encoder == 'ffmpeg':
+        return FFmpegWriter(
+            out_path,
+            video_properties['fps'],
+            size,
+            codec=video_properties.get('codec', 'libx264'),
+            preset=video_properties.get('preset', 'medium'),
+            crf=video_properties.get('crf'),
+            threads=video_properties.get('threads', 0),
+            audio_path=video_properties.get('audio_path')
+        )
+    if encoder != 'opencv':
+        raise ValueError(f'未知的编码器：{encoder}')
+    # 帧始终是单通道灰度图，isColor=False 让编码器直接接收灰度帧
+    return cv2.VideoWriter(out_path, cv2.VideoWriter_fourcc(*'mp4v'), video_properties['fps'], size, isColor=False)
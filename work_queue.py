@@ -0,0 +1,115 @@
+import msgpack
+
+import os
+import time
+import socket
+
+JOB_NAME = 'job.mp'
+CLAIMS_DIR = 'claims'
+# 认领超过这么多秒没有更新（工作进程每渲染一批帧会更新一次）就视为失效，可由其他工作进程接手
+CLAIM_TIMEOUT = 600
+# 协调进程检查各段是否完成的间隔（秒）
+POLL_INTERVAL = 1
+
+
+class SegmentQueue:
+    """
+    以共享目录（段目录，可位于 NFS 等网络文件系统上）实现的分段渲染任务队列：
+      job.mp          协调进程发布的任务：码位、各段的范围与文件名、视频参数、自定义字体路径和 opts；
+      claims/<段>.claim  工作进程以独占方式创建，表示认领了这一段，内容为 主机名:pid；
+      <段>.mp4        编码完成的段，由工作进程从临时文件原子地改名而来。
+    协调进程只发布任务并等待所有段的文件出现，不需要与工作进程直接通信。
+    """
+
+    def __init__(self, segments_dir):
+        self.segments_dir = segments_dir
+        self.claims_dir = os.path.join(segments_dir, CLAIMS_DIR)
+        os.makedirs(self.claims_dir, exist_ok=True)
+        self.owner = f'{socket.gethostname()}:{os.getpid()}'
+
+    def write_job(self, job):
+        path = os.path.join(self.segments_dir, JOB_NAME)
+        with open(path + '.tmp', 'wb') as f:
+            f.write(msgpack.packb(job))
+        os.replace(path + '.tmp', path)
+
+    def read_job(self):
+        with open(os.path.join(self.segments_dir, JOB_NAME), 'rb') as f:
+            return msgpack.unpackb(f.read())
+
+    def segment_path(self, segment):
+        return os.path.join(self.segments_dir, segment['file'])
+
+    def part_path(self, segment):
+        """本工作进程编码这一段时使用的临时文件；接手失效认领的进程与原进程不会写入同一个文件。"""
+        name = self.owner.replace(':', '-')
+        return self.segment_path(segment)[:-len('.mp4')] + f'.{name}.part.mp4'
+
+    def _claim_path(self, segment):
+        return os.path.join(self.claims_dir, segment['file'] + '.claim')
+
+    def is_done(self, segment):
+        return os.path.exists(self.segment_path(segment))
+
+    def _owns(self, segment):
+        """认领文件是否仍属于本工作进程；停顿超过 CLAIM_TIMEOUT 后可能已被其他工作进程接手。"""
+        try:
+            with open(self._claim_path(segment), encoding='utf-8') as f:
+                return f.read() == self.owner
+        except FileNotFoundError:
+            return False
+
+    def _try_claim(self, segment):
+        try:
+            fd = os.open(self._claim_path(segment), os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+        except FileExistsError:
+            return False
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            f.write(self.owner)
+        return True
+
+    def _take_over(self, segment):
+        claim_path = self._claim_path(segment)
+        try:
+            if time.time() - os.path.getmtime(claim_path) < CLAIM_TIMEOUT:
+                return False
+            # 改名只有一个进程能成功，避免多个进程同时接手
+            stale_path = f'{claim_path}.{self.owner.replace(":", "-")}.stale'
+            os.rename(claim_path, stale_path)
+        except FileNotFoundError:
+            return False
+        os.remove(stale_path)
+        return self._try_claim(segment)
+
+    def claim(self, segments):
+        """认领一个尚未完成的段并返回它；先找没有被认领的段，再找认领已失效的段，都没有时返回 None。"""
+        for take in (self._try_claim, self._take_over):
+            for segment in segments:
+                if not self.is_done(segment) and take(segment):
+                    # 认领后再确认一次，其他进程可能刚好完成了这一段
+                    if not self.is_done(segment):
+                        return segment
+                    self.release(segment)
+        return None
+
+    def heartbeat(self, segment):
+        """更新认领的时间，表示这一段仍在渲染；认领已被其他工作进程接手时什么也不做。"""
+        if not self._owns(segment):
+            return
+        try:
+            os.utime(self._claim_path(segment))
+        except FileNotFoundError:
+            pass
+
+    def finish(self, segment, part_path):
+        os.replace(part_path, self.segment_path(segment))
+        self.release(segment)
+
+    def release(self, segment):
+        """删除本工作进程的认领；认领已被其他工作进程接手时保留它。"""
+        if not self._owns(segment):
+            return
+        try:
+            os.remove(self._claim_path(segment))
+        except FileNotFoundError:
+            pass